@@ -0,0 +1,90 @@
+import asyncio
+
+# One place that knows which game is running in which channel. Games are kept
+# per kind ("uno", "trivia", "chest", "monopoly") in a dict keyed by channel
+# id, so starting, finding and ending a game are all dict operations. Tasks a
+# game spawns (turn timers, expiry timers) are tracked with it and cancelled
+# when it ends, and each kind can register hooks that run on the way out.
+
+
+class _Entry:
+    __slots__ = ("game", "tasks")
+
+    def __init__(self, game):
+        self.game = game
+        self.tasks = set()
+
+
+class GameRegistry:
+    def __init__(self):
+        self._entries = {}    # kind -> {channel_id: _Entry}
+        self._end_hooks = {}  # kind -> [hook(channel_id, game)]
+
+    def get(self, kind, channel_id):
+        entry = self._entries.get(kind, {}).get(channel_id)
+        return entry.game if entry else None
+
+    def running(self, kind, channel_id):
+        return channel_id in self._entries.get(kind, {})
+
+    def games(self, kind):
+        return [entry.game for entry in self._entries.get(kind, {}).values()]
+
+    def start(self, kind, channel_id, game):
+        """Register game for the channel. Returns False if one of this kind is already there."""
+        channels = self._entries.setdefault(kind, {})
+        if channel_id in channels:
+            return False
+        channels[channel_id] = _Entry(game)
+        return True
+
+    def track(self, kind, channel_id, task):
+        """Tie a task to the channel's game so it is cancelled when the game ends."""
+        entry = self._entries.get(kind, {}).get(channel_id)
+        if entry is None:
+            task.cancel()
+            return task
+        entry.tasks.add(task)
+        task.add_done_callback(entry.tasks.discard)
+        return task
+
+    def on_end(self, kind, hook=None):
+        """Register hook(channel_id, game) to run when a game of this kind ends. Usable as a decorator."""
+        if hook is None:
+            return lambda fn: self.on_end(kind, fn)
+        self._end_hooks.setdefault(kind, []).append(hook)
+        return hook
+
+    def end(self, kind, channel_id, game=None):
+        """Remove the channel's game and clean up after it. Returns the game, or None if nothing was running.
+
+        Passing game only ends it if it is still the one registered, so a late
+        timer from an old game can't end the next one in the same channel.
+        """
+        channels = self._entries.get(kind, {})
+        entry = channels.get(channel_id)
+        if entry is None or (game is not None and entry.game is not game):
+            return None
+        del channels[channel_id]
+
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        for task in list(entry.tasks):
+            if task is not current:
+                task.cancel()
+
+        for hook in self._end_hooks.get(kind, []):
+            try:
+                hook(channel_id, entry.game)
+            except Exception as e:
+                print(f"[GAMES] {kind} end hook failed in {channel_id}: {e}")
+        return entry.game
+
+    def end_all(self, kind):
+        for channel_id in list(self._entries.get(kind, {})):
+            self.end(kind, channel_id)
+
+
+games = GameRegistry()
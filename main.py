@@ -6,6 +6,11 @@
 
 
 import threading
+import copy
+import functools
+import math
+import time
+from collections import OrderedDict, deque
 import discord
 from discord import SelectOption
 from discord.ext import commands, tasks
@@ -14,20 +19,24 @@ from discord.ui import Button, View, Select
 import random
 from random import randint, choice
 import asyncio
-import json
 import pytz
 import string
 import difflib
 from difflib import get_close_matches
-import html
 import os
 import aiohttp
 from aiohttp import web
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from discord.ext.commands import MissingRequiredArgument
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import sys
 import traceback
+from game_registry import games
+from trivia_bank import QuestionBank, QuestionSampler
+from uno_core import (RED, YELLOW, GREEN, BLUE, COLOR_EMOJIS, CARD_VALUE, DRAW_AMOUNT, NOT_STARTING,
+                      REVERSE, SKIP, WILDS, card_label, is_playable, new_deck, playable_cards, recolor, unplayed)
 
 CREATOR_IDS = [955882470690140200, 521399748687691810]
 
@@ -55,15 +64,448 @@ MONGO_URI = os.getenv("MONGO_URL")
 client = AsyncIOMotorClient(MONGO_URI)
 
 db = client["raiko"] 
-users = db["users_test"]
+
+
+# ----------- USER CACHE -----------
+# Process-local copy of recently used user documents. Every command starts with
+# one or more users.find_one({"_id": ...}) calls, so keeping the document around
+# for a short while turns the repeated reads into dictionary lookups.
+
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 60  # seconds
+
+def _set_path(doc, path, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        doc = doc.setdefault(key, {})
+        if not isinstance(doc, dict):
+            raise TypeError(path)
+    doc[keys[-1]] = value
+
+def _inc_path(doc, path, amount):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        doc = doc.setdefault(key, {})
+        if not isinstance(doc, dict):
+            raise TypeError(path)
+    doc[keys[-1]] = doc.get(keys[-1], 0) + amount
+
+def _with_net_worth(update):
+    """Keep the denormalised net_worth (wallet + bank) in step with wallet/bank writes.
+
+    $inc on wallet or bank adds the same delta to net_worth, and a $set of both
+    wallet and bank sets net_worth to their sum. Pipelines and updates that
+    already mention net_worth are left alone.
+    """
+    if not isinstance(update, dict) or any("net_worth" in (fields or {}) for fields in update.values()):
+        return update
+    inc = update.get("$inc", {})
+    fields = update.get("$set", {})
+    if "wallet" in inc or "bank" in inc:
+        update = {**update, "$inc": {**inc, "net_worth": inc.get("wallet", 0) + inc.get("bank", 0)}}
+    elif "wallet" in fields and "bank" in fields:
+        update = {**update, "$set": {**fields, "net_worth": fields["wallet"] + fields["bank"]}}
+    return update
+
+def _project(doc, projection):
+    """Apply an inclusion projection ({"a.b": 1} or ["a.b"]) to a cached document."""
+    fields = [f for f, keep in projection.items() if keep] if isinstance(projection, dict) else projection
+    out = {"_id": doc["_id"]}
+    for path in fields:
+        keys = path.split(".")
+        value = doc
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            _set_path(out, path, value)
+    return out
+
+def _unset_path(doc, path):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        doc = doc.get(key)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(keys[-1], None)
+
+
+class UserCache:
+    """Size-bounded LRU of user documents with a per-entry TTL.
+
+    Entries remember the logical time their read started. A read that raced a
+    write to the same user is never stored, and a write only patches entries
+    that were read before it began; anything ambiguous is simply dropped.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._docs = OrderedDict()        # user_id -> (expires, read_at, doc)
+        self._last_write = OrderedDict()  # user_id -> clock of the latest write
+        self._clock = 0
+        self._floor = 0                   # reads started before this are never stored
+
+    def tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get(self, user_id):
+        entry = self._docs.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._docs.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._docs.move_to_end(user_id)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def put(self, user_id, doc, read_at):
+        if read_at <= self._floor or self._last_write.get(user_id, 0) >= read_at:
+            return
+        self._docs[user_id] = (time.monotonic() + self.ttl, read_at, copy.deepcopy(doc))
+        self._docs.move_to_end(user_id)
+        while len(self._docs) > self.max_size:
+            self._docs.popitem(last=False)
+
+    def begin_write(self, user_id):
+        started = self.tick()
+        self._mark_written(user_id, started)
+        return started
+
+    def finish_write(self, user_id, update, started, matched=True):
+        entry = self._docs.get(user_id)
+        if entry is not None:
+            if matched and entry[1] < started and self._patch(entry[2], update):
+                self._docs[user_id] = (entry[0], started, entry[2])
+            elif matched:
+                del self._docs[user_id]
+        self._mark_written(user_id, self.tick())
+
+    def invalidate(self, user_id=None):
+        if user_id is None:
+            self._docs.clear()
+            self._last_write.clear()
+            self._clock += 1
+            self._floor = self._clock
+        else:
+            self._docs.pop(user_id, None)
+            self._mark_written(user_id, self.tick())
+
+    def _mark_written(self, user_id, clock):
+        self._last_write[user_id] = clock
+        self._last_write.move_to_end(user_id)
+        while len(self._last_write) > self.max_size * 2:
+            self._last_write.popitem(last=False)
+
+    @staticmethod
+    def _patch(doc, update):
+        if not isinstance(update, dict) or any(op not in ("$set", "$inc", "$unset") for op in update):
+            return False
+        try:
+            for path, value in update.get("$set", {}).items():
+                _set_path(doc, path, copy.deepcopy(value))
+            for path, amount in update.get("$inc", {}).items():
+                _inc_path(doc, path, amount)
+            for path in update.get("$unset", {}):
+                _unset_path(doc, path)
+        except TypeError:
+            return False
+        return True
+
+
+class CachedUserCollection:
+    """Wraps the users collection so reads and writes keyed by _id go through user_cache.
+
+    Anything this class does not override (find, aggregate, create_index, ...)
+    is forwarded to the underlying Motor collection untouched.
+    """
+
+    def __init__(self, collection, cache):
+        self.collection = collection
+        self.cache = cache
+        self.listeners = []  # called with each update document; None means "anything may have changed"
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def notify(self, update=None):
+        for listener in self.listeners:
+            listener(update)
+
+    @staticmethod
+    def _doc_id(filter):
+        if isinstance(filter, dict) and isinstance(filter.get("_id"), str):
+            return filter["_id"]
+        return None
+
+    async def find_one(self, filter=None, projection=None, *args, **kwargs):
+        user_id = self._doc_id(filter)
+        if user_id is None or len(filter) != 1 or args or kwargs:
+            return await self.collection.find_one(filter, projection, *args, **kwargs)
+
+        doc = self.cache.get(user_id)
+        if doc is not None:
+            return _project(doc, projection) if projection else doc
+        if projection:
+            # A partial document can't stand in for the full one, so it isn't cached
+            return await self.collection.find_one(filter, projection)
+        read_at = self.cache.tick()
+        doc = await self.collection.find_one(filter)
+        if doc is not None:
+            self.cache.put(user_id, doc, read_at)
+        return doc
+
+    async def update_one(self, filter, update, *args, **kwargs):
+        update = _with_net_worth(update)
+        user_id = self._doc_id(filter)
+        if user_id is None:
+            self.cache.invalidate()
+            result = await self.collection.update_one(filter, update, *args, **kwargs)
+            self.notify(update)
+            return result
+
+        started = self.cache.begin_write(user_id)
+        try:
+            result = await self.collection.update_one(filter, update, *args, **kwargs)
+        except Exception:
+            self.cache.invalidate(user_id)
+            raise
+        self.cache.finish_write(user_id, update, started, matched=result.matched_count > 0)
+        self.notify(update)
+        return result
+
+    async def find_one_and_update(self, filter, update, *args, **kwargs):
+        update = _with_net_worth(update)
+        user_id = self._doc_id(filter)
+        if user_id is None:
+            self.cache.invalidate()
+            result = await self.collection.find_one_and_update(filter, update, *args, **kwargs)
+            self.notify(update)
+            return result
+
+        started = self.cache.begin_write(user_id)
+        try:
+            doc = await self.collection.find_one_and_update(filter, update, *args, **kwargs)
+        except Exception:
+            self.cache.invalidate(user_id)
+            raise
+
+        # ReturnDocument.AFTER is True; only a full post-write document is safe to keep
+        if doc is not None and kwargs.get("return_document") and not kwargs.get("projection") and not args:
+            self.cache.invalidate(user_id)
+            self.cache.put(user_id, doc, self.cache.tick())
+        elif kwargs.get("upsert"):
+            self.cache.invalidate(user_id)
+        else:
+            self.cache.finish_write(user_id, update, started, matched=doc is not None)
+        self.notify(update)
+        return doc
+
+    async def insert_one(self, document, *args, **kwargs):
+        user_id = self._doc_id(document)
+        try:
+            return await self.collection.insert_one(document, *args, **kwargs)
+        finally:
+            self.cache.invalidate(user_id)
+
+    async def update_many(self, filter, update, *args, **kwargs):
+        try:
+            return await self.collection.update_many(filter, _with_net_worth(update), *args, **kwargs)
+        finally:
+            self.cache.invalidate()
+            self.notify(update)
+
+    async def delete_one(self, *args, **kwargs):
+        try:
+            return await self.collection.delete_one(*args, **kwargs)
+        finally:
+            self.cache.invalidate()
+            self.notify()
+
+    async def delete_many(self, *args, **kwargs):
+        try:
+            return await self.collection.delete_many(*args, **kwargs)
+        finally:
+            self.cache.invalidate()
+            self.notify()
+
+    async def bulk_write(self, *args, **kwargs):
+        try:
+            return await self.collection.bulk_write(*args, **kwargs)
+        finally:
+            self.cache.invalidate()
+            self.notify()
+
+
+user_cache = UserCache()
+users = CachedUserCollection(db["users_test"], user_cache)
 bot_settings = db["bot_settingstest"]
+cooldown_docs = db["cooldowns_test"]
+lottery_draws = db["lottery_draws_test"]
+scheduled_jobs = db["scheduled_jobs_test"]
+trivia_history = db["trivia_history_test"]
+
+
+# ----------- SETTINGS CACHE -----------
+# The global checks below run before every command, so the disabled commands,
+# the lockdown flag and the muted users are kept in memory. The admin commands
+# update this copy as they write, and refresh_settings() re-reads Mongo
+# periodically to pick up writes made by other processes.
+
+SETTINGS_REFRESH_SECONDS = 30
+
+class BotSettings:
+    def __init__(self):
+        self.disabled_commands = set()
+        self.lockdown = False
+        self.muted_users = set()
+        self.loaded = False
+        self.version = 0  # bumped around every local write
+        self._writes_in_flight = 0
+
+    async def _local_write(self, write):
+        """Await a Mongo write whose change is already applied in memory, fencing off refresh()."""
+        self.version += 1
+        self._writes_in_flight += 1
+        try:
+            await write
+        finally:
+            self._writes_in_flight -= 1
+            self.version += 1
+
+    async def refresh(self):
+        # A write made while this reads (or still on its way to Mongo) would be
+        # reverted in memory by what we read, so such a refresh is dropped
+        version = self.version
+        if self._writes_in_flight:
+            return
+        docs = {}
+        async for doc in bot_settings.find({"_id": {"$in": ["disabled_commands", "config"]}}):
+            docs[doc["_id"]] = doc
+        disabled = docs.get("disabled_commands", {})
+        config = docs.get("config", {})
+        muted = set()
+        async for doc in users.find({"muted": True}, {"_id": 1}):
+            muted.add(str(doc["_id"]))
+        if self.version != version or self._writes_in_flight:
+            return
+
+        self.disabled_commands = set(disabled.get("commands", []))
+        self.lockdown = config.get("lockdown", False)
+        self.muted_users = muted
+        self.loaded = True
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.refresh()
+
+    async def disable_command(self, name):
+        self.disabled_commands.add(name)
+        await self._local_write(bot_settings.update_one(
+            {"_id": "disabled_commands"},
+            {"$addToSet": {"commands": name}},
+            upsert=True
+        ))
+
+    async def enable_command(self, name):
+        self.disabled_commands.discard(name)
+        await self._local_write(bot_settings.update_one(
+            {"_id": "disabled_commands"},
+            {"$pull": {"commands": name}},
+            upsert=True
+        ))
+
+    async def set_lockdown(self, enabled):
+        self.lockdown = enabled
+        await self._local_write(bot_settings.update_one({"_id": "config"}, {"$set": {"lockdown": enabled}}, upsert=True))
+
+    async def set_muted(self, user_id, muted):
+        user_id = str(user_id)
+        if muted:
+            self.muted_users.add(user_id)
+            await self._local_write(users.update_one({"_id": user_id}, {"$set": {"muted": True}}, upsert=True))
+        else:
+            self.muted_users.discard(user_id)
+            await self._local_write(users.update_one({"_id": user_id}, {"$unset": {"muted": ""}}))
+
+    def is_muted(self, user_id):
+        return str(user_id) in self.muted_users
+
+settings_cache = BotSettings()
+
+@tasks.loop(seconds=SETTINGS_REFRESH_SECONDS)
+async def refresh_settings():
+    try:
+        await settings_cache.refresh()
+        # Cooldown resets made by another process take effect here within one refresh
+        await cooldown_store.sync_generations()
+    except Exception as e:
+        print(f"[WARNING] Settings refresh failed: {e}")
+
+
+# ----------- COMMAND GATE -----------
+# One check decides whether a command may run: disabled commands are blocked for
+# everyone, the admin commands below skip lockdown and mute, then lockdown and
+# mute are applied. Each stage is timed so ;gatestats can report p50/p99.
+
+GATE_ALWAYS_ALLOWED = ("raikomute", "raikoum", "lockdown", "unlock", "resetcd", "resetweekly")
+GATE_SAMPLE_SIZE = 1000
+
+class CommandGate:
+    STAGES = ("load", "disabled", "lockdown", "muted", "total")
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.samples = {stage: deque(maxlen=GATE_SAMPLE_SIZE) for stage in self.STAGES}
+
+    async def admit(self, ctx):
+        start = last = time.perf_counter()
+
+        def lap(stage):
+            nonlocal last
+            now = time.perf_counter()
+            self.samples[stage].append(now - last)
+            last = now
+
+        try:
+            await self.settings.ensure_loaded()
+            lap("load")
+
+            name = ctx.command.name if ctx.command else None
+            if name in self.settings.disabled_commands:
+                return False
+            lap("disabled")
+
+            if name in GATE_ALWAYS_ALLOWED:
+                return True
+
+            if self.settings.lockdown and ctx.author.id not in CREATOR_IDS:
+                await ctx.send("Bot is currently in lockdown!")
+                return False
+            lap("lockdown")
+
+            if self.settings.is_muted(ctx.author.id):
+                raise commands.CheckFailure("❌ You are muted and cannot use bot commands.")
+            lap("muted")
+            return True
+        finally:
+            self.samples["total"].append(time.perf_counter() - start)
+
+    def percentile(self, stage, q):
+        data = sorted(self.samples[stage])
+        if not data:
+            return 0.0
+        return data[min(len(data) - 1, int(q * len(data)))]
+
+command_gate = CommandGate(settings_cache)
 
-# Block disabled commands
 @bot.check
-async def global_command_block(ctx):
-    settings = await bot_settings.find_one({"_id": "disabled_commands"}) or {}
-    disabled = settings.get("commands", [])
-    return ctx.command.name not in disabled
+async def global_command_gate(ctx):
+    return await command_gate.admit(ctx)
     
 async def test_mongodb():
     try:
@@ -72,6 +514,59 @@ async def test_mongodb():
     except Exception as e:
         print(f"❌ MongoDB connection failed: {e}")
 
+# ----------- INDEXES -----------
+# Indexes for the non-_id queries the bot runs. Partial indexes only hold the
+# documents the query can match (ticket holders, muted users, non-empty banks),
+# so they stay small no matter how many users there are. bot_settings is only
+# ever read by _id, which Mongo indexes already.
+
+USER_INDEXES = [
+    IndexModel([("lottery_tickets", ASCENDING)], name="lottery_ticket_holders",
+               partialFilterExpression={"lottery_tickets": {"$gt": 0}}),
+    IndexModel([("muted", ASCENDING)], name="muted_users",
+               partialFilterExpression={"muted": True}),
+    IndexModel([("bank", ASCENDING)], name="nonempty_banks",
+               partialFilterExpression={"bank": {"$gt": 0}}),
+    IndexModel([("wallet", DESCENDING)], name="wallet_desc"),
+    IndexModel([("net_worth", DESCENDING)], name="net_worth_desc"),
+    IndexModel([("stats.tictactoe.wins", DESCENDING)], name="ttt_wins_desc", sparse=True),
+    IndexModel([("stats.connect4.wins", DESCENDING)], name="c4_wins_desc", sparse=True),
+    IndexModel([("stats.rps.wins", DESCENDING)], name="rps_wins_desc", sparse=True),
+    IndexModel([("stats.blackjack.wins", DESCENDING)], name="blackjack_wins_desc", sparse=True),
+    IndexModel([("stats.trivia.points", DESCENDING)], name="trivia_points_desc", sparse=True),
+]
+
+# Cooldown documents delete themselves once expires_at has passed
+COOLDOWN_INDEXES = [
+    IndexModel([("user", ASCENDING)], name="cooldowns_by_user"),
+    IndexModel([("expires_at", ASCENDING)], name="cooldowns_ttl", expireAfterSeconds=0),
+]
+
+async def ensure_indexes():
+    """Create missing indexes (a no-op for ones that already exist) and print what's there."""
+    for label, collection, indexes in (("users", users, USER_INDEXES), ("cooldowns", cooldown_docs, COOLDOWN_INDEXES)):
+        try:
+            existing = set(await collection.index_information())
+            await collection.create_indexes(indexes)
+            for index in indexes:
+                name = index.document["name"]
+                state = "ready" if name in existing else "created"
+                print(f"✅ Index {label}.{name}: {state}")
+        except Exception as e:
+            print(f"❌ Index provisioning for {label} failed: {e}")
+
+async def backfill_net_worth():
+    """Give documents written before net_worth existed their wallet + bank total."""
+    try:
+        result = await users.update_many(
+            {"net_worth": {"$exists": False}},
+            [{"$set": {"net_worth": {"$add": [{"$ifNull": ["$wallet", 0]}, {"$ifNull": ["$bank", 0]}]}}}]
+        )
+        if result.modified_count:
+            print(f"✅ Backfilled net_worth for {result.modified_count} users.")
+    except Exception as e:
+        print(f"❌ net_worth backfill failed: {e}")
+
 
 @bot.command()
 async def clearbanks(ctx):
@@ -84,7 +579,8 @@ async def clearbanks(ctx):
             {
                 "$set": {
                     "wallet": {"$add": ["$wallet", "$bank"]},
-                    "bank": 0
+                    "bank": 0,
+                    "net_worth": {"$add": ["$wallet", "$bank"]}
                 }
             }
         ]
@@ -95,31 +591,42 @@ async def clearbanks(ctx):
 
 # ----------- USER UTILS -----------
 
+# Every new user document starts from this, whichever command touches them first
+NEW_USER_DEFAULTS = {
+    "wallet": 0,
+    "bank": 0,
+    "net_worth": 0,
+    "notes": [],
+    "stats": {
+        "wins": 0,
+        "losses": 0,
+        "landmine_streak": 0,
+        "ttt": {"wins": 0, "losses": 0},
+        "rps": {"wins": 0, "losses": 0},
+        "blackjack": {"wins": 0, "losses": 0},
+        "hangman": {"wins": 0, "losses": 0},
+        "connect4": {"wins": 0, "losses": 0}
+    }
+}
+
 async def ensure_user(user_id):
+    """Return the user's document, creating it from NEW_USER_DEFAULTS in the same round-trip if needed."""
     user_id = str(user_id)
-    user = await users.find_one({"_id": user_id})
-    if not user:
-        user = {
-            "_id": user_id,
-            "wallet": 0,
-            "bank": 0,
-            "notes": [],
-            "stats": {
-                "wins": 0,
-                "losses": 0,
-                "ttt": {"wins": 0, "losses": 0},
-                "rps": {"wins": 0, "losses": 0},
-                "blackjack": {"wins": 0, "losses": 0},
-                "hangman": {"wins": 0, "losses": 0},
-                "connect4": {"wins": 0, "losses": 0}
-            },
-            "cooldowns": {}
-        }
-        await users.insert_one(user)
-    return user
+    user = users.cache.get(user_id)
+    if user is not None:
+        return user
+    return await users.find_one_and_update(
+        {"_id": user_id},
+        {"$setOnInsert": copy.deepcopy(NEW_USER_DEFAULTS)},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
 
-async def get_user(user_id):
-    return await users.find_one({"_id": str(user_id)})
+async def get_user(user_id, fields=None):
+    """Fetch a user document. Pass fields (e.g. ["wallet", "bank"]) to load only what you need."""
+    await wallet_writer.barrier(user_id)
+    projection = {field: 1 for field in fields} if fields else None
+    return await users.find_one({"_id": str(user_id)}, projection)
 
 async def update_user(user_id, updates):
     await users.update_one({"_id": str(user_id)}, {"$set": updates})
@@ -127,30 +634,459 @@ async def update_user(user_id, updates):
 async def increment_user(user_id, field_path, amount):
     await users.update_one({"_id": str(user_id)}, {"$inc": {field_path: amount}})
 
-# ----------- COOLDOWN UTILITY -----------
+# ----------- WALLET OPERATIONS -----------
+# Bets and payments go through these helpers. A debit is one conditional update
+# that only matches while the wallet still covers the amount, so placing a bet
+# is a single round-trip and two commands running at once can't overdraw.
 
-async def is_on_cooldown(user_id, command_name, cooldown_seconds):
-    user = await users.find_one({"_id": str(user_id)})
-    if not user:
-        return False, 0
+async def debit_wallet(user_id, amount, inc=None, guard=None, fields=("wallet",)):
+    """Take amount from the wallet if it's there. Returns the updated fields, or None if too poor."""
+    if amount <= 0:
+        return None  # a negative debit would be a credit
+    await wallet_writer.barrier(user_id)
+    query = {"_id": str(user_id), "wallet": {"$gte": amount}}
+    if guard:
+        query.update(guard)
+    return await users.find_one_and_update(
+        query,
+        {"$inc": {"wallet": -amount, **(inc or {})}},
+        projection={field: 1 for field in fields},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def credit_wallet(user_id, amount, inc=None):
+    await users.update_one(
+        {"_id": str(user_id)},
+        {"$inc": {"wallet": amount, **(inc or {})}},
+        upsert=True
+    )
 
-    cooldowns = user.get("cooldowns", {})
-    last_used_str = cooldowns.get(command_name)
+async def transfer_wallet(sender_id, receiver_id, amount):
+    """Move amount between wallets. Returns False without touching anything if the sender is short."""
+    if amount <= 0:
+        return False
+    if not await debit_wallet(sender_id, amount):
+        return False
+    await credit_wallet(receiver_id, amount)
+    return True
 
-    if not last_used_str:
-        return False, 0
+# ----------- WALLET WRITE-BEHIND -----------
+# Rewards that nobody reads back straight away (trivia, chests, slot payouts,
+# work/daily/weekly) are queued instead of written one by one. Increments for
+# the same user are merged, and everything queued within WALLET_FLUSH_INTERVAL
+# goes out as a single unordered bulk_write.
+
+WALLET_FLUSH_INTERVAL = 0.05  # seconds
+WALLET_RETRY_DELAY = 5  # seconds to wait after a failed flush before trying again
+
+class WalletWriteBehind:
+    def __init__(self, users_collection, interval=WALLET_FLUSH_INTERVAL):
+        self.users = users_collection
+        self.interval = interval
+        self._pending = {}  # user_id -> {field path: amount}
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    def add(self, user_id, amount, inc=None):
+        incs = self._pending.setdefault(str(user_id), {})
+        update = _with_net_worth({"$inc": {"wallet": amount, **(inc or {})}})
+        for path, value in update["$inc"].items():
+            incs[path] = incs.get(path, 0) + value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Keep going while anything is queued: add() skips scheduling while this
+        # task is alive, and a failed flush puts its batch back in _pending.
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            ok = await self.flush()
+            if not self._pending:
+                return
+            delay = self.interval if ok else WALLET_RETRY_DELAY
+
+    async def barrier(self, user_id=None):
+        """Wait until queued increments (for user_id, or for everyone) have reached Mongo."""
+        if self._lock.locked():
+            # A batch is in flight and _pending doesn't show it; let it land first
+            async with self._lock:
+                pass
+        if self._pending and (user_id is None or str(user_id) in self._pending):
+            await self.flush()
+
+    def _requeue(self, uid, incs):
+        self.users.cache.invalidate(uid)
+        pending = self._pending.setdefault(uid, {})
+        for path, value in incs.items():
+            pending[path] = pending.get(path, 0) + value
+
+    async def flush(self):
+        """Write everything queued. Returns False if any of it failed and was put back in the queue."""
+        async with self._lock:
+            if not self._pending:
+                return True
+            batch, self._pending = self._pending, {}
+            user_ids = list(batch)
+            ops = [UpdateOne({"_id": uid}, {"$inc": batch[uid]}, upsert=True) for uid in user_ids]
 
+            cache = self.users.cache
+            started = {uid: cache.begin_write(uid) for uid in user_ids}
+            failed = set()
+            try:
+                await self.users.collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # writeErrors are increments Mongo rejected, so they were not applied
+                failed = {user_ids[err["index"]] for err in e.details.get("writeErrors", [])}
+                print(f"[ERROR] Wallet flush: {len(failed)} of {len(ops)} increments failed, re-queued.")
+            except Exception:
+                # A network error or timeout doesn't say whether the $inc landed, and
+                # retrying one that did would pay twice. Log it for a manual fix instead.
+                print(f"[ERROR] Wallet flush of {len(ops)} increments failed with an unknown outcome, not retried: {batch}")
+                traceback.print_exc()
+                for uid in user_ids:
+                    cache.invalidate(uid)
+                self.users.notify(None)
+                return False
+
+            for uid in user_ids:
+                if uid in failed:
+                    self._requeue(uid, batch[uid])
+                else:
+                    cache.finish_write(uid, {"$inc": batch[uid]}, started[uid])
+                    self.users.notify({"$inc": batch[uid]})
+
+        # When called from _flush_later that task is still running and loops on
+        # _pending itself; otherwise make sure something will pick up the rest.
+        if self._pending and not self._closed and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return not failed
+
+    async def close(self):
+        self._closed = True
+        # Let a batch that is already being written finish: cancelling it inside
+        # bulk_write would drop it, since it has left _pending by then
+        async with self._lock:
+            if self._flush_task and not self._flush_task.done():
+                self._flush_task.cancel()
+        await self.flush()
+        if self._pending:
+            print(f"[ERROR] Wallet increments left unwritten at shutdown: {self._pending}")
+
+wallet_writer = WalletWriteBehind(users)
+
+def queue_wallet_credit(user_id, amount, inc=None):
+    """Credit a wallet through the write-behind queue; use wallet_writer.barrier() to read it back."""
+    wallet_writer.add(user_id, amount, inc)
+
+def queue_wallet_credits(credits, mirror=()):
+    """Queue {user_id: amount} in one go so it all lands in the same bulk_write.
+
+    Each amount is also added to every field path in mirror (e.g. a stats counter).
+    """
+    for user_id, amount in credits.items():
+        wallet_writer.add(user_id, amount, {path: amount for path in mirror})
+
+# ----------- COOLDOWNS -----------
+# Every running cooldown is one document in cooldown_docs, keyed
+# "<user_id>:<name>" and holding the moment it expires. The TTL index on
+# expires_at removes it afterwards, so nothing here sweeps old entries. In
+# memory a user's timers are {name: expiry in epoch seconds}, loaded for all
+# names in one query the first time the user is seen; after that every check
+# is a dict lookup. Item cooldowns use the name "item:<item name>".
+#
+# Resetting a cooldown for everyone doesn't touch any documents: each one is
+# stamped with the generation it was claimed under ([global, per-name]), and
+# a reset just bumps a counter in bot_settings. Documents from an older
+# generation count as expired and the TTL index deletes them in due course.
+
+COOLDOWN_CACHE_SIZE = 5000
+
+def _epoch(dt):
+    """Mongo hands back naive UTC datetimes; turn one into epoch seconds."""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+class CooldownStore:
+    def __init__(self, collection, settings, size=COOLDOWN_CACHE_SIZE):
+        self.collection = collection
+        self.settings = settings
+        self.size = size
+        self.generation = 0           # bumped by clear_all()
+        self.name_generations = {}    # name -> bumped by clear_all(name)
+        self._timers = OrderedDict()  # user_id -> {name: expires}
+        self._loads = {}              # user_id -> in-flight load task
+        self._changes = {}            # user_id -> {name: expires or None} made while loading
+
+    def _gen(self, name):
+        return [self.generation, self.name_generations.get(name, 0)]
+
+    def _apply_generations(self, doc):
+        self.generation = (doc or {}).get("all", 0)
+        self.name_generations = dict((doc or {}).get("names", {}))
+
+    async def load_generations(self):
+        self._apply_generations(await self.settings.find_one({"_id": "cooldown_generations"}))
+
+    async def sync_generations(self):
+        """Pick up resets made by another process, dropping cached timers they invalidated."""
+        old_all, old_names = self.generation, self.name_generations
+        await self.load_generations()
+        if self.generation != old_all:
+            self._forget()
+            return
+        for name in set(old_names) | set(self.name_generations):
+            if old_names.get(name, 0) != self.name_generations.get(name, 0):
+                self._forget(name)
+
+    def _forget(self, name=None):
+        """Drop one cooldown (or every cooldown) from memory for all users."""
+        for timers in list(self._timers.values()) + list(self._changes.values()):
+            if name is None:
+                timers.clear()
+            else:
+                timers.pop(name, None)
+
+    async def timers(self, user_id):
+        """Return {name: expires} for user_id, hitting Mongo only the first time."""
+        user_id = str(user_id)
+        timers = self._timers.get(user_id)
+        if timers is not None:
+            self._timers.move_to_end(user_id)
+            return timers
+        if user_id not in self._loads:
+            self._loads[user_id] = asyncio.ensure_future(self._load(user_id))
+        return await asyncio.shield(self._loads[user_id])
+
+    async def _load(self, user_id):
+        self._changes[user_id] = {}
+        timers = {}
+        try:
+            docs = await self.collection.find({"user": user_id}, {"name": 1, "expires_at": 1, "gen": 1}).to_list(length=None)
+        finally:
+            changes = self._changes.pop(user_id)
+            del self._loads[user_id]
+        for doc in docs:
+            if doc.get("gen", [0, 0]) == self._gen(doc["name"]):
+                timers[doc["name"]] = _epoch(doc["expires_at"])
+        for name, expires in changes.items():
+            if expires is None:
+                timers.pop(name, None)
+            else:
+                timers[name] = expires
+
+        self._timers[user_id] = timers
+        while len(self._timers) > self.size:
+            self._timers.popitem(last=False)
+        return timers
+
+    def _record(self, user_id, name, expires):
+        timers = self._timers.get(user_id)
+        if timers is not None:
+            if expires is None:
+                timers.pop(name, None)
+            else:
+                timers[name] = expires
+        if user_id in self._changes:
+            self._changes[user_id][name] = expires
+
+    async def remaining(self, user_id, name):
+        """Whole seconds left on the cooldown, 0 when it's free."""
+        expires = (await self.timers(user_id)).get(name)
+        return max(0, int(expires - time.time())) if expires else 0
+
+    async def active(self, user_id):
+        """Every cooldown still running for user_id as {name: seconds left}."""
+        now = time.time()
+        timers = await self.timers(user_id)
+        for name in [n for n, expires in timers.items() if expires <= now]:
+            del timers[name]
+        return {name: int(expires - now) for name, expires in timers.items()}
+
+    async def start(self, user_id, name, seconds):
+        user_id = str(user_id)
+        expires = int(time.time()) + seconds
+        self._record(user_id, name, expires)
+        await self.collection.update_one(
+            {"_id": f"{user_id}:{name}"},
+            {"$set": {"user": user_id, "name": name, "gen": self._gen(name),
+                      "expires_at": datetime.fromtimestamp(expires, timezone.utc)}},
+            upsert=True
+        )
+        return expires
+
+    async def claim(self, user_id, name, seconds, _resynced=False):
+        """Start the cooldown only if it isn't running, in one conditional upsert.
+
+        Returns (True, expires) when claimed, (False, seconds left) otherwise.
+        """
+        user_id = str(user_id)
+        key = f"{user_id}:{name}"
+        now = time.time()
+        current = (await self.timers(user_id)).get(name)
+        if current and current > now:
+            return False, int(current - now)
+
+        expires = int(now) + seconds
+        # Recorded before the await so a second invocation in this process sees it
+        self._record(user_id, name, expires)
+        try:
+            gen = self._gen(name)
+            # Only documents from an older generation count as expired. One from
+            # a newer generation means another process reset cooldowns since we
+            # last looked, so it must not be overwritten with our stale stamp.
+            await self.collection.update_one(
+                {"_id": key, "$or": [
+                    {"expires_at": {"$lte": datetime.fromtimestamp(now, timezone.utc)}},
+                    {"gen": {"$exists": False}},
+                    {"gen.0": {"$lt": gen[0]}},
+                    {"gen.0": gen[0], "gen.1": {"$lt": gen[1]}},
+                ]},
+                {"$set": {"user": user_id, "name": name, "gen": gen,
+                          "expires_at": datetime.fromtimestamp(expires, timezone.utc)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The document exists and hasn't expired: someone else claimed it first
+            doc = await self.collection.find_one({"_id": key}, {"expires_at": 1, "gen": 1})
+            if doc and not _resynced and doc.get("gen", [0, 0]) > gen:
+                # Written under a generation we haven't seen: catch up and try again
+                self._record(user_id, name, current)
+                await self.sync_generations()
+                return await self.claim(user_id, name, seconds, _resynced=True)
+            held = _epoch(doc["expires_at"]) if doc else None
+            self._record(user_id, name, held)
+            return False, max(0, int(held - now)) if held else 0
+        except Exception:
+            self._record(user_id, name, current)
+            raise
+        return True, expires
+
+    async def release(self, user_id, name, expires):
+        """Undo a claim(), unless the cooldown has been claimed again since."""
+        user_id = str(user_id)
+        if (await self.timers(user_id)).get(name) == expires:
+            self._record(user_id, name, None)
+        await self.collection.delete_one({"_id": f"{user_id}:{name}", "expires_at": datetime.fromtimestamp(expires, timezone.utc)})
+
+    async def clear(self, user_id, names=None):
+        """Clear the given cooldowns for user_id, or all of them when names is None."""
+        user_id = str(user_id)
+        query = {"user": user_id}
+        if names is None:
+            names = list(await self.timers(user_id))
+        else:
+            query["name"] = {"$in": list(names)}
+        for name in names:
+            self._record(user_id, name, None)
+        await self.collection.delete_many(query)
+
+    async def clear_all(self, name=None):
+        """Clear one cooldown (or every cooldown) for all users by bumping its generation."""
+        doc = await self.settings.find_one_and_update(
+            {"_id": "cooldown_generations"},
+            {"$inc": {"all" if name is None else f"names.{name}": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._apply_generations(doc)
+        self._forget(name)
+
+cooldown_store = CooldownStore(cooldown_docs, bot_settings)
+
+# name -> seconds for every command gated by @cooldown, in definition order
+COOLDOWNS = {}
+
+def format_cooldown(seconds):
+    days, rem = divmod(int(seconds), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, secs = divmod(rem, 60)
+    parts = [f"{value}{unit}" for value, unit in ((days, "d"), (hours, "h"), (minutes, "m")) if value]
+    if not days and not hours:
+        parts.append(f"{secs}s")
+    return " ".join(parts)
+
+def cooldown(name, seconds, message="⏳ You can use this again in **{time}**."):
+    """Gate a command behind a per-user cooldown, claimed before the command body runs.
+
+    The claim is a single conditional write, so two invocations racing each
+    other can't both get through. If the body raises, or calls
+    refund_cooldown(ctx) because it turned the request down, the claim is
+    given back.
+    """
+    COOLDOWNS[name] = seconds
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(ctx, *args, **kwargs):
+            claimed, value = await cooldown_store.claim(ctx.author.id, name, seconds)
+            if not claimed:
+                return await ctx.send(message.format(time=format_cooldown(value)))
+            ctx.cooldown_claim = (name, value)
+            try:
+                return await func(ctx, *args, **kwargs)
+            except Exception:
+                await refund_cooldown(ctx)
+                raise
+        return wrapper
+    return decorator
+
+async def refund_cooldown(ctx):
+    claim = getattr(ctx, "cooldown_claim", None)
+    if claim:
+        ctx.cooldown_claim = None
+        await cooldown_store.release(ctx.author.id, *claim)
+
+LEGACY_ITEM_COOLDOWN_SECONDS = 86400
+
+def _legacy_time(value):
+    if isinstance(value, datetime):
+        return value, False
     try:
-        last_used = datetime.fromisoformat(last_used_str)
-        now = datetime.utcnow()
-        elapsed = (now - last_used).total_seconds()
-        remaining = int(cooldown_seconds - elapsed)
-        if remaining > 0:
-            return True, remaining
-    except Exception:
+        return datetime.fromisoformat(value), False
+    except (TypeError, ValueError):
         pass
+    try:
+        # hangman wrote its expiry, not its start, in this format
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S"), True
+    except (TypeError, ValueError):
+        return None, False
 
-    return False, 0
+async def migrate_legacy_cooldowns():
+    """Move timestamps still sitting in users.cooldowns into cooldown_docs."""
+    try:
+        migrated = 0
+        now = time.time()
+        async for user in users.find({"cooldowns": {"$type": "object", "$ne": {}}}, {"cooldowns": 1}):
+            entries = [(name, value, COOLDOWNS[name])
+                       for name, value in user["cooldowns"].items() if name in COOLDOWNS]
+            items = user["cooldowns"].get("item_usage")
+            if isinstance(items, dict):
+                entries += [(f"item:{item}", value, LEGACY_ITEM_COOLDOWN_SECONDS) for item, value in items.items()]
+
+            ops = []
+            for name, value, seconds in entries:
+                moment, is_expiry = _legacy_time(value)
+                if moment is None:
+                    continue
+                expires = _epoch(moment) + (0 if is_expiry else seconds)
+                if expires > now:
+                    ops.append(UpdateOne(
+                        {"_id": f"{user['_id']}:{name}"},
+                        {"$set": {"user": user["_id"], "name": name, "gen": cooldown_store._gen(name),
+                                  "expires_at": datetime.fromtimestamp(expires, timezone.utc)}},
+                        upsert=True
+                    ))
+            if ops:
+                await cooldown_docs.bulk_write(ops, ordered=False)
+            unset = {f"cooldowns.{name}": "" for name in user["cooldowns"] if name in COOLDOWNS or name == "item_usage"}
+            if unset:
+                await users.update_one({"_id": user["_id"]}, {"$unset": unset})
+                migrated += 1
+        if migrated:
+            print(f"✅ Moved legacy cooldowns for {migrated} users.")
+    except Exception as e:
+        print(f"❌ Cooldown migration failed: {e}")
 
 
 # =================== SHOP =====================================
@@ -193,10 +1129,6 @@ async def buy(ctx, *, item_name):
     item = SHOP_ITEMS[item_key]
     price = item["price"]
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-
-    if not user or user.get("wallet", 0) < price:
-        return await ctx.send("🚫 You don't have enough 🥖.")
 
     class ConfirmView(discord.ui.View):
         def __init__(self):
@@ -206,11 +1138,8 @@ async def buy(ctx, *, item_name):
         async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
             if interaction.user.id != ctx.author.id:
                 return await interaction.response.send_message("Not your confirmation.", ephemeral=True)
-            await users.update_one(
-                {"_id": user_id},
-                {"$inc": {"wallet": -price, f"inventory.{item_key}": 1}},
-                upsert=True
-            )
+            if not await debit_wallet(user_id, price, inc={f"inventory.{item_key}": 1}):
+                return await interaction.response.edit_message(content="🚫 You don't have enough 🥖.", view=None)
             await interaction.response.edit_message(content=f"✅ Purchased {item_key} for {price} 🥖!", view=None)
 
         @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger)
@@ -224,7 +1153,7 @@ async def buy(ctx, *, item_name):
 # Inventory aliases
 @bot.command(aliases=["inv", "items"])
 async def inventory(ctx):
-    user = await users.find_one({"_id": str(ctx.author.id)})
+    user = await get_user(ctx.author.id, ["inventory"])
     inventory = user.get("inventory", {}) if user else {}
     if not inventory:
         return await ctx.send("📅 Your inventory is empty.")
@@ -249,11 +1178,9 @@ class ConfirmBuy(View):
     async def confirm_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user != self.user:
             return await interaction.response.send_message("This confirmation isn't for you!", ephemeral=True)
-        await users.update_one(
-            {"_id": str(self.user.id)},
-            {"$inc": {"wallet": -self.price, f"inventory.{self.item}": 1}},
-            upsert=True
-        )
+        if not await debit_wallet(self.user.id, self.price, inc={f"inventory.{self.item}": 1}):
+            self.stop()
+            return await interaction.response.edit_message(content="🚫 You don't have enough 🥖.", view=None)
         await interaction.response.edit_message(content=f"✅ You bought **{self.item}** for {self.price} 🥖!", view=None)
         self.stop()
 
@@ -288,11 +1215,6 @@ class Shop(commands.Cog):
             return await ctx.send("❌ Item not found in shop.")
 
         price = SHOP_ITEMS[match]["price"]
-        user_id = str(ctx.author.id)
-        user = await users.find_one({"_id": user_id})
-        if not user or user.get("wallet", 0) < price:
-            return await ctx.send("🚫 You don't have enough 🥖.")
-
         view = ConfirmBuy(match, ctx.author, ctx, price)
         await ctx.send(f"Are you sure you want to buy **{match}** for {price} 🥖?", view=view)
 
@@ -302,7 +1224,7 @@ class Shop(commands.Cog):
 async def use(ctx, *, item_name: str):
     """Use an item from your inventory (fuzzy matched)."""
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
+    user = await get_user(user_id, ["inventory"])
 
     if not user or "inventory" not in user or not user["inventory"]:
         return await ctx.send("❌ You don’t have that item.")
@@ -343,22 +1265,11 @@ async def use(ctx, *, item_name: str):
 
     # === COOLDOWN HANDLING ===
     cooldown_items = ["🧲 Lucky Magnet", "🎯 Target Scope", "💣 Fake Bomb", "🔑 Skeleton Key", "📜 Contract", "🔫 Gun"]
-    now = datetime.utcnow()
-    cooldowns = user.get("cooldowns", {}).get("item_usage", {})
-
-    last_used = cooldowns.get(matched_key)
-    if matched_key in cooldown_items and last_used:
-        if isinstance(last_used, str):
-            try:
-                last_used = datetime.fromisoformat(last_used)
-            except Exception:
-                last_used = now  # fallback
-        delta = now - last_used
-        if delta < timedelta(hours=24):
-            remaining = timedelta(hours=24) - delta
-            hours, rem = divmod(remaining.seconds, 3600)
-            minutes = rem // 60
-            return await ctx.send(f"⏳ You must wait {hours}h {minutes}m before using {matched_key} again.")
+    remaining = await cooldown_store.remaining(user_id, f"item:{matched_key}")
+    if matched_key in cooldown_items and remaining:
+        hours, rem = divmod(remaining, 3600)
+        minutes = rem // 60
+        return await ctx.send(f"⏳ You must wait {hours}h {minutes}m before using {matched_key} again.")
 
     # === ITEM EFFECTS ===
     msg = ""
@@ -389,7 +1300,7 @@ async def use(ctx, *, item_name: str):
 
     elif matched_key == "🔑 Skeleton Key":
         if random.random() < 0.5:
-            await users.update_one({"_id": user_id}, {"$unset": {"cooldowns": ""}})
+            await cooldown_store.clear(user_id)
             msg = "🔑 Your Skeleton Key reset **all cooldowns**!"
         else:
             msg = "💀 Your Skeleton Key broke into pieces... nothing happened."
@@ -432,10 +1343,9 @@ async def use(ctx, *, item_name: str):
         return await ctx.send("❌ That item cannot be used yet.")
 
     # Final update: remove item + set cooldown
-    await users.update_one({"_id": user_id}, {
-        "$inc": {f"inventory.{matched_key}": -1},
-        "$set": {f"cooldowns.item_usage.{matched_key}": now}
-    })
+    await users.update_one({"_id": user_id}, {"$inc": {f"inventory.{matched_key}": -1}})
+    if matched_key in cooldown_items:
+        await cooldown_store.start(user_id, f"item:{matched_key}", 86400)
 
     await ctx.send(f"✅ {msg}")
 
@@ -444,13 +1354,41 @@ async def setup(bot):
 
 # =================================================================
 
-# Load & shuffle the full question set once at startup
-with open("trivia_questions.json", "r") as f:
-    ALL_TRIVIA_QUESTIONS = json.load(f)
-random.shuffle(ALL_TRIVIA_QUESTIONS)
+# Parse, unescape and index the question set once at startup
+TRIVIA_BANK_REFRESH_SECONDS = 60
+trivia_bank = QuestionBank("trivia_questions.json")
+try:
+    print(f"✅ Loaded {trivia_bank.load()} trivia questions.")
+except ValueError as e:
+    print(f"❌ Trivia questions not loaded: {e}")
+
+# Per-channel draws with no repeats inside the sampler's window. Weights are
+# relative to 1; leave a category or point value out to keep it at 1.
+TRIVIA_CATEGORY_WEIGHTS = {}
+TRIVIA_POINTS_WEIGHTS = {}
+trivia_sampler = QuestionSampler(trivia_bank, TRIVIA_CATEGORY_WEIGHTS, TRIVIA_POINTS_WEIGHTS)
+
+async def draw_trivia_question(channel_id):
+    """Next question for the channel; its recent-question window is kept in trivia_history across restarts."""
+    if not trivia_sampler.has(channel_id):
+        doc = await trivia_history.find_one({"_id": channel_id}) or {}
+        trivia_sampler.restore(channel_id, doc.get("recent", []))
+    question = trivia_sampler.draw(channel_id)
+    await trivia_history.update_one(
+        {"_id": channel_id},
+        {"$set": {"recent": trivia_sampler.recent(channel_id)}},
+        upsert=True
+    )
+    return question
 
-# Questions draw-pile
-unused_trivia_questions = ALL_TRIVIA_QUESTIONS.copy()
+@tasks.loop(seconds=TRIVIA_BANK_REFRESH_SECONDS)
+async def refresh_trivia_bank():
+    """Pick up edits to trivia_questions.json without a restart."""
+    try:
+        if trivia_bank.refresh():
+            print(f"🔄 Reloaded {len(trivia_bank.questions)} trivia questions.")
+    except ValueError as e:
+        print(f"❌ Trivia reload failed, keeping the old questions: {e}")
 
 def global_except_hook(exc_type, exc_value, exc_traceback):
     print("❌ Uncaught exception:", file=sys.stderr)
@@ -470,8 +1408,7 @@ async def coinflip(ctx, bet: int):
         return await ctx.send("❗ Usage: `;coinflip <bet>`")
 
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-    if not user or user.get("wallet", 0) < bet:
+    if not await debit_wallet(user_id, bet):
         return await ctx.send("💸 You don’t have enough 🥖 to bet.")
 
     class CoinFlipView(View):
@@ -498,16 +1435,16 @@ async def coinflip(ctx, bet: int):
     await view.wait()
 
     if not view.value:
+        await credit_wallet(user_id, bet)
         return await ctx.send("⏳ Timed out.")
 
     outcome = choice(["Heads", "Tails"])
     await ctx.send(f"🌀 Flipping... 🎲")
     await asyncio.sleep(2)
     if view.value == outcome:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": bet}})
+        await credit_wallet(user_id, bet * 2)
         await ctx.send(f"🎉 It's **{outcome}**! You won **+{bet} 🥖**!")
     else:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": -bet}})
         await ctx.send(f"💀 It's **{outcome}**. You lost **-{bet} 🥖**.")
 
 @bot.command()
@@ -516,8 +1453,7 @@ async def slot(ctx, bet: int):
         return await ctx.send("❗ Usage: `;slot <bet>`")
 
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-    if not user or user.get("wallet", 0) < bet:
+    if not await debit_wallet(user_id, bet):
         return await ctx.send("💸 You don’t have enough 🥖 to bet.")
 
     symbols = ["🍒", "🍋", "🔔", "⭐", "💎"]
@@ -529,14 +1465,13 @@ async def slot(ctx, bet: int):
 
     if reel[0] == reel[1] == reel[2]:
         win = bet * 5
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": win}})
+        queue_wallet_credit(user_id, bet + win)
         await ctx.send(f"🎉 Jackpot! You won **+{win} 🥖**!")
     elif reel[0] == reel[1] or reel[1] == reel[2]:
         win = int(bet * 1.5)
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": win}})
+        queue_wallet_credit(user_id, bet + win)
         await ctx.send(f"✨ Partial match! You won **+{win} 🥖**!")
     else:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": -bet}})
         await ctx.send(f"💀 No match. You lost **-{bet} 🥖**.")
 
 @bot.command()
@@ -545,8 +1480,7 @@ async def dice(ctx, bet: int):
         return await ctx.send("❗ Usage: `;dice <bet>`")
 
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-    if not user or user.get("wallet", 0) < bet:
+    if not await debit_wallet(user_id, bet):
         return await ctx.send("💸 You don’t have enough 🥖 to bet.")
 
     await ctx.send("🎲 Rolling dice...")
@@ -556,12 +1490,12 @@ async def dice(ctx, bet: int):
     await ctx.send(f"🧍 You rolled **{user_roll}**\n🤖 Bot rolled **{bot_roll}**")
 
     if user_roll > bot_roll:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": bet}})
+        await credit_wallet(user_id, bet * 2)
         await ctx.send(f"🎉 You win! +{bet} 🥖")
     elif user_roll < bot_roll:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": -bet}})
         await ctx.send(f"💀 You lose! -{bet} 🥖")
     else:
+        await credit_wallet(user_id, bet)
         await ctx.send("😐 It's a tie! Your bet is returned.")
 
 @bot.command()
@@ -570,8 +1504,7 @@ async def roulette(ctx, bet: int):
         return await ctx.send("❗ Usage: `;roulette <bet>`")
 
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-    if not user or user.get("wallet", 0) < bet:
+    if not await debit_wallet(user_id, bet):
         return await ctx.send("💸 You don’t have enough 🥖 to bet.")
 
     numbers_1 = [discord.SelectOption(label=str(i), value=str(i)) for i in range(0, 19)]
@@ -608,6 +1541,7 @@ async def roulette(ctx, bet: int):
     await view.wait()
 
     if not view.bets:
+        await credit_wallet(user_id, bet)
         return await ctx.send("⏳ Timed out or no bets made.")
 
     all_slots = [str(i) for i in range(0, 37)] + ["00"]
@@ -638,10 +1572,9 @@ async def roulette(ctx, bet: int):
 
     await ctx.send(f"🌀 Ball spins... lands on **{spin_result}**")
     if win:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": payout}})
+        await credit_wallet(user_id, bet + payout)
         await ctx.send(f"🎉 You win **+{payout} 🥖**!")
     else:
-        await users.update_one({"_id": user_id}, {"$inc": {"wallet": -bet}})
         await ctx.send(f"💀 You lost **-{bet} 🥖**.")
 
 
@@ -652,26 +1585,15 @@ async def roulette(ctx, bet: int):
 @bot.command(aliases=["lm"])
 async def landmine(ctx, bet: int):
     user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id})
-
-    if not user:
-        await users.insert_one({"_id": user_id, "wallet": 0, "bank": 0, "stats": {"landmine_streak": 0}})
-        user = await users.find_one({"_id": user_id})
 
     if bet <= 0:
         return await ctx.send("❗ Please enter a bet greater than 0 you moron.")
 
-    if user.get("wallet", 0) < bet:
+    # Deduct the bet only if the wallet covers it
+    user = await debit_wallet(user_id, bet, fields=("wallet", "stats.landmine_streak"))
+    if not user:
         return await ctx.send("❌ You don't even have enough bread to bet that, broke ass bitch.")
 
-    wallet = user.get("wallet", 0)
-    if wallet < 0:
-        await users.update_one({"_id": user_id}, {"$set": {"wallet": 0}})
-        wallet = 0
-
-    # Deduct the bet after passing checks
-    await users.update_one({"_id": user_id}, {"$inc": {"wallet": -bet}})
-
     win_streak = user.get("stats", {}).get("landmine_streak", 0)
 
     # Randomly pick 13 bomb tiles
@@ -735,77 +1657,13 @@ async def landmine(ctx, bet: int):
 
 import traceback  # Needed for detailed error logging
 
-active_uno_games = []
+# Cards are ints from uno_core; card_label() turns one into its emoji string
+# only when it's shown in an embed, dropdown or message.
+COLOR_CHOICES = [RED, GREEN, BLUE, YELLOW]
 
-COLORS = ['🔴', '🟡', '🟢', '🔵']
-VALUES = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '⏭️', '🔁', '+2']
-WILD_CARDS = ['Wild', '+4']
-
-CARD_EMOJIS = {
-    '⏭️': '⏭️ Skip',
-    '🔁': '🔁 Reverse',
-    '+2': '+2 Draw',
-    'Wild': '🌈 Wild',
-    '+4': '+4 Draw',
-}
-
-def generate_deck():
-    try:
-        deck = [f"{color} {val}" for color in COLORS for val in VALUES * 2] + WILD_CARDS * 4
-        print(f"[DEBUG] Generated deck with {len(deck)} cards.")
-        return deck
-    except Exception as e:
-        print("[ERROR] Failed to generate deck.")
-        traceback.print_exc()
-        return []
-
-def card_color(card):
-    try:
-        return card.split()[0] if card not in WILD_CARDS else None
-    except Exception as e:
-        print(f"[ERROR] card_color() failed on card: {card}")
-        traceback.print_exc()
-
-def card_value(card):
-    try:
-        return card.split()[-1]
-    except Exception as e:
-        print(f"[ERROR] card_value() failed on card: {card}")
-        traceback.print_exc()
-
-def is_valid_play(card, top_card, draw_stack, color_override=None):
-    try:
-        top = color_override or top_card
-
-        # Draw stack is active
-        if draw_stack:
-            # Only allow stacking if the same type of draw card
-            if '+2' in card and '+2' in top:
-                return True
-            if '+4' in card and '+4' in top:
-                return True
-            return False  # Can't play any other cards during draw stack
-
-        # Always allow wilds
-        if card in WILD_CARDS:
-            return True
-
-        card_parts = card.split()
-        top_parts = top.split()
-
-        if len(card_parts) < 2 or len(top_parts) < 2:
-            print(f"[DEBUG] Invalid card format: {card} vs {top}")
-            return False
-
-        same_color = card_parts[0] == top_parts[0]
-        same_value = card_parts[1] == top_parts[1]
-
-        return same_color or same_value
-
-    except Exception as e:
-        print(f"[ERROR] is_valid_play() failed with card={card}, top_card={top_card}, draw_stack={draw_stack}")
-        traceback.print_exc()
-        return False
+UNO_TURN_SECONDS = 30
+UNO_CALL_SECONDS = 10
+UNO_EVENT_LINES = 4  # moves shown under the board
 
 
 class ColorSelectView(discord.ui.View):
@@ -814,13 +1672,13 @@ class ColorSelectView(discord.ui.View):
         self.game = game
         self.user = user
 
-        for color in ["🔴", "🟢", "🔵", "🟡"]:
+        for color in COLOR_CHOICES:
             self.add_item(ColorButton(color, game, user))
 
 
 class ColorButton(discord.ui.Button):
     def __init__(self, color, game, user):
-        super().__init__(label=color, style=discord.ButtonStyle.primary)
+        super().__init__(label=COLOR_EMOJIS[color], style=discord.ButtonStyle.primary)
         self.color = color
         self.game = game
         self.user = user
@@ -829,19 +1687,20 @@ class ColorButton(discord.ui.Button):
         if interaction.user != self.user:
             return await interaction.response.send_message("⛔ You're not the one choosing the color.", ephemeral=True)
 
+        g = self.game
+        if g.ended or g.pending_color != self.user:
+            return await interaction.response.edit_message(content="⌛ Too late to pick a color.", view=None)
+
         try:
             # Apply the chosen color
-            self.game.color_override = self.color
-            top_value = self.game.pile[-1].split(" ")[-1]  # Should be +4 or Wild
-            self.game.pile[-1] = f"{self.color} {top_value}"
+            g.pile[-1] = recolor(g.pile[-1], self.color)  # Should be +4 or Wild
+            g.top_card = g.pile[-1]
+            g.pending_color = None
 
-            # Turn ends after choosing color
-            await interaction.followup.send(f"🎨 {interaction.user.mention} chose **{self.color}**!", ephemeral=False)
-            self.game.advance_turn()
-            await start_uno_game(interaction.client, self.game)
-
-            # Clean up the color select buttons
-            await interaction.message.edit(view=None)
+            # Answer the private picker; the game message gets the rest in one edit
+            await interaction.response.edit_message(content=f"🎨 You chose **{COLOR_EMOJIS[self.color]}**.", view=None)
+            g.log(f"🎨 {interaction.user.display_name} chose **{COLOR_EMOJIS[self.color]}**")
+            await finish_play(interaction.client, g, interaction.user)
 
         except Exception:
             print("[UNO ERROR] Color selection failed.")
@@ -859,28 +1718,32 @@ class UnoGame:
             self.bet = bet
             self.ended = False
             self.players = players
-            self.deck = generate_deck()
-            random.shuffle(self.deck)
+            self.deck = new_deck()
+            print(f"[DEBUG] Generated deck with {len(self.deck)} cards.")
             self.hands = {p: [self.deck.pop() for _ in range(7)] for p in players}
             print(f"[DEBUG] Hands dealt: {[len(self.hands[p]) for p in players]}")
             self.pile = [self.deck.pop()]
             self.top_card = self.pile[-1]  # ✅ Set the initial top card
-            print(f"[DEBUG] First top card: {self.pile[-1]}")
-            while self.pile[-1] in WILD_CARDS or any(x in self.pile[-1] for x in ['⏭️', '+2']):
-                print(f"[DEBUG] Top card {self.pile[-1]} not allowed. Replacing...")
+            print(f"[DEBUG] First top card: {card_label(self.pile[-1])}")
+            while CARD_VALUE[self.pile[-1]] in NOT_STARTING:
+                print(f"[DEBUG] Top card {card_label(self.pile[-1])} not allowed. Replacing...")
                 self.deck.insert(0, self.pile.pop())
                 self.pile.append(self.deck.pop())
                 self.top_card = self.pile[-1]  # ✅ Update top_card again in case it changed
-            print(f"[DEBUG] Valid starting top card: {self.pile[-1]}")
+            print(f"[DEBUG] Valid starting top card: {card_label(self.pile[-1])}")
             self.current = 0
             self.direction = 1
             self.draw_stack = 0
             self.called_uno = {}
-            self.color_override = None
             self.skip_next = False
             self.message = None
             self.draw_flag = False
-            active_uno_games.append(self)
+            self.turn = 0  # bumped on every advance so stale timers can tell
+            self.turn_ends = None
+            self.events = deque(maxlen=UNO_EVENT_LINES)
+            self.pending_color = None  # player who played a wild and hasn't picked yet
+            self.awaiting_uno = None   # player with one card whose UNO call window is open
+            self.uno_wait = None
             print(f"[DEBUG] UNO game created successfully.")
         except Exception as e:
             print("[ERROR] Failed during UnoGame initialization")
@@ -905,10 +1768,29 @@ class UnoGame:
     def reset_draw_stack(self):
         self.draw_stack = 0
 
+    def log(self, text):
+        self.events.append(text)
+
+    def draw(self, player, count=1):
+        """Deal cards to player, reshuffling the pile under the top card into the deck when it runs out."""
+        drawn = []
+        for _ in range(count):
+            if not self.deck:
+                if len(self.pile) < 2:
+                    break
+                self.deck = [unplayed(c) for c in self.pile[:-1]]
+                del self.pile[:-1]
+                random.shuffle(self.deck)
+                self.log("🔀 The deck ran out, so the pile was reshuffled.")
+            drawn.append(self.deck.pop())
+        self.hands[player].extend(drawn)
+        return drawn
 
     def advance_turn(self):
         try:
             self.current = (self.current + self.direction) % len(self.players)
+            self.turn += 1
+            self.draw_flag = False
             print(f"[DEBUG] Turn advanced | New current: {self.players[self.current].display_name}")
         except Exception as e:
             print("[ERROR] Failed to advance turn")
@@ -916,41 +1798,37 @@ class UnoGame:
 
     def remove_game(self):
         try:
-            if self in active_uno_games:
-                active_uno_games.remove(self)
+            if games.end("uno", self.ctx.channel.id, self):
                 print("[DEBUG] UNO game removed from active list.")
         except Exception as e:
             print("[ERROR] Failed to remove game from active list")
             traceback.print_exc()
 
-    async def end_game(self, winner=None, reason=None):
+    async def end_game(self, winner=None, reason=None, interaction=None):
         try:
             print(f"[DEBUG] Ending game | Winner: {winner.display_name if winner else None} | Reason: {reason}")
-            if self.timer_task:
-                self.timer_task.cancel()
-
             if winner:
                 pool = self.bet * len(self.players)
                 await users.update_one({"_id": str(winner.id)}, {"$inc": {"wallet": pool}}, upsert=True)
-                await self.message.channel.send(f"🎉 {winner.mention} wins {pool} 🥖! Game Over.")
+                self.log(f"🎉 {winner.mention} wins {pool} 🥖! Game Over.")
             elif reason:
-                await self.message.channel.send(f"❌ Game ended: {reason}")
+                self.log(f"❌ Game ended: {reason}")
+            self.ended = True  # the final board below replaces the end hook's
             self.remove_game()
+            await show_uno_game(self, interaction)
         except Exception as e:
             print("[ERROR] Failed to end UNO game")
             traceback.print_exc()
 
     def apply_card_effect(self, card):
         try:
-            print(f"[DEBUG] Applying card effect: {card}")
-            if '+2' in card:
-                self.draw_stack += 2
-                print(f"[DEBUG] +2 card played. New draw stack: {self.draw_stack}")
-            elif '+4' in card:
-                self.draw_stack += 4
-                print(f"[DEBUG] +4 card played. New draw stack: {self.draw_stack}")
-
-            if '🔁' in card:
+            print(f"[DEBUG] Applying card effect: {card_label(card)}")
+            if DRAW_AMOUNT[card]:
+                self.draw_stack += DRAW_AMOUNT[card]
+                print(f"[DEBUG] {card_label(card)} played. New draw stack: {self.draw_stack}")
+
+            value = CARD_VALUE[card]
+            if value == REVERSE:
                 if len(self.players) == 2:
                     self.skip_next = True
                     print("[DEBUG] Reverse used as Skip (2 players)")
@@ -958,26 +1836,50 @@ class UnoGame:
                     self.direction *= -1
                     print(f"[DEBUG] Reverse card played. New direction: {self.direction}")
 
-            if '⏭️' in card:
+            if value == SKIP:
                 self.skip_next = True
                 print("[DEBUG] Skip card played. Next player will be skipped.")
         except Exception as e:
-            print(f"[ERROR] apply_card_effect() failed for card: {card}")
+            print(f"[ERROR] apply_card_effect() failed for card: {card_label(card)}")
             traceback.print_exc()
 
+@games.on_end("uno")
+def _close_uno_game(channel_id, game):
+    # Timers were tracked with the game and are already cancelled; stop any
+    # callback still in flight from starting another turn.
+    if game.ended:
+        return
+    game.ended = True
+    game.log("🛑 Game stopped.")
+    if game.message:
+        run_in_background(show_uno_game(game))
+
 # ================================
 # === UNO HELPER FUNCTIONS ======
 # ================================
 
 def generate_game_embed(game):
     try:
-        top_card = game.pile[-1] if game.pile else "🂠"
-        embed = discord.Embed(title="🎮 UNO Game", color=discord.Color.blue())
+        top_card = card_label(game.pile[-1]) if game.pile else "🂠"
+        if game.ended:
+            embed = discord.Embed(title="🏁 UNO Game Over", color=discord.Color.dark_grey())
+        else:
+            embed = discord.Embed(title="🎮 UNO Game", color=discord.Color.blue())
         embed.add_field(name="Top Card", value=top_card, inline=False)
-        embed.add_field(name="Current Turn", value=game.current_player().mention, inline=True)
 
-        next_index = (game.current + game.direction) % len(game.players)  # ✅ Use .current
-        embed.add_field(name="Next", value=game.players[next_index].mention, inline=True)
+        if not game.ended:
+            embed.add_field(name="Current Turn", value=game.current_player().mention, inline=True)
+
+            next_index = (game.current + game.direction) % len(game.players)  # ✅ Use .current
+            embed.add_field(name="Next", value=game.players[next_index].mention, inline=True)
+            if game.draw_stack:
+                embed.add_field(name="Draw Stack", value=f"+{game.draw_stack}", inline=True)
+            if game.turn_ends:
+                # Discord counts this down on its own, so no edits are needed to show it
+                embed.add_field(name="Time Left", value=f"<t:{game.turn_ends}:R>", inline=True)
+
+        if game.events:
+            embed.add_field(name="Last Moves", value="\n".join(game.events), inline=False)
 
         embed.set_footer(text=f"Pool: {game.bet * len(game.players)} 🥖")
         return embed
@@ -990,9 +1892,10 @@ def generate_game_embed(game):
 
 def generate_game_view(game):
     try:
+        player = game.current_player()
         view = View(timeout=None)
-        view.add_item(DrawButton(game))
-        view.add_item(HandDropdown(game))
+        view.add_item(HandDropdown(game, player))
+        view.add_item(DrawButton(game, player))
         print("[DEBUG] Game view generated")
         return view
     except Exception as e:
@@ -1000,6 +1903,23 @@ def generate_game_view(game):
         traceback.print_exc()
         return View()
 
+
+async def show_uno_game(game, interaction=None):
+    """Put the game's current state on its one message, in a single API call.
+
+    An interaction that came from the game message is answered by editing that
+    message, which also acknowledges it; otherwise the message is edited directly.
+    """
+    embed = generate_game_embed(game)
+    view = None if game.ended or game.awaiting_uno else generate_game_view(game)
+    if game.message is None:
+        game.message = await game.ctx.send(embed=embed, view=view)
+    elif (interaction is not None and not interaction.response.is_done()
+          and interaction.message is not None and interaction.message.id == game.message.id):
+        await interaction.response.edit_message(embed=embed, view=view)
+    else:
+        await game.message.edit(embed=embed, view=view)
+
 # ================================
 # === UNO COMMAND REGISTRATION ===
 # ================================
@@ -1008,7 +1928,7 @@ def register_uno_commands(bot):
     @bot.command()
     async def uno(ctx, bet: int):
         try:
-            if any(g.message and g.message.channel.id == ctx.channel.id for g in active_uno_games):
+            if games.running("uno", ctx.channel.id):
                 return await ctx.send("⚠️ A UNO game is already running in this channel.")
 
             if bet <= 0:
@@ -1018,7 +1938,7 @@ def register_uno_commands(bot):
             joined_ids = {p.id for p in players}
 
             for p in players:
-                doc = await users.find_one({"_id": str(p.id)})
+                doc = await get_user(p.id, ["wallet"])
                 if not doc or doc.get("wallet", 0) < bet:
                     return await ctx.send(f"🚫 {p.display_name} doesn't have enough 🥖.")
 
@@ -1035,7 +1955,7 @@ def register_uno_commands(bot):
                             return await interaction.response.send_message("❗ You already joined.", ephemeral=True)
                         if len(players) >= 6:
                             return await interaction.response.send_message("❗ Max 6 players.", ephemeral=True)
-                        doc2 = await users.find_one({"_id": str(uid)})
+                        doc2 = await get_user(uid, ["wallet"])
                         if not doc2 or doc2.get("wallet", 0) < bet:
                             return await interaction.response.send_message("❗ Not enough 🥖.", ephemeral=True)
 
@@ -1077,11 +1997,25 @@ def register_uno_commands(bot):
             if len(players) < 2:
                 return await ctx.send("❗ Not enough players joined. Game cancelled.")
 
+            paid = []
             for p in players:
-                await users.update_one({"_id": str(p.id)}, {"$inc": {"wallet": -bet}}, upsert=True)
+                if await debit_wallet(p.id, bet):
+                    paid.append(p)
+                else:
+                    await ctx.send(f"🚫 {p.display_name} no longer has enough 🥖 and was removed.")
+            players[:] = paid
+
+            if len(players) < 2:
+                for p in players:
+                    await credit_wallet(p.id, bet)
+                return await ctx.send("❗ Not enough players could cover the bet. Game cancelled.")
 
             game = UnoGame(ctx, bet, players)
-            active_uno_games.append(game)
+            if not games.start("uno", ctx.channel.id, game):
+                # Another lobby in this channel finished first
+                for p in players:
+                    await credit_wallet(p.id, bet)
+                return await ctx.send("⚠️ A UNO game is already running in this channel. Bets refunded.")
 
             try:
                 await start_uno_game(bot, game)
@@ -1107,22 +2041,37 @@ class DrawButton(discord.ui.Button):
         self.user = user
 
     async def callback(self, interaction):
-        if interaction.user != self.user:
+        g = self.game
+        if interaction.user != self.user or g.ended or g.current_player() != self.user:
             return await interaction.response.send_message("❗ It’s not your turn.", ephemeral=True)
+        if g.pending_color or g.awaiting_uno:
+            return await interaction.response.send_message("❗ Finish your play first.", ephemeral=True)
+        if g.draw_flag:
+            return await interaction.response.send_message("❗ You already drew. Play a card or wait.", ephemeral=True)
 
         try:
-            drawn_card = self.game.deck.pop()
-            self.game.hands[self.user].append(drawn_card)
+            name = self.user.display_name
 
-            await interaction.response.send_message(f"🃏 You drew: `{drawn_card}`", ephemeral=True)
+            # Under a +2/+4 stack, drawing takes the whole stack and ends the turn
+            if g.draw_stack:
+                count = g.draw_stack
+                g.draw(self.user, count)
+                g.draw_stack = 0
+                g.log(f"🃏 {name} drew **{count} cards**. Turn skipped.")
+                g.advance_turn()
+                return await start_uno_game(interaction.client, g, interaction)
+
+            drawn = g.draw(self.user)
 
             # If it's playable, allow them to still play it manually
-            if is_valid_play(drawn_card, self.game.top_card, self.game.draw_stack, self.game.color_override):
-                await self.game.ctx.send(f"🔄 {self.user.display_name} drew a playable card.")
+            if drawn and is_playable(drawn[0], g.pile[-1], g.draw_stack):
+                g.draw_flag = True
+                g.log(f"🔄 {name} drew a playable card.")
+                await show_uno_game(g, interaction)  # the turn timer keeps running
             else:
-                self.game.advance_turn()
-                self.game.top_card = self.game.pile[-1]  # ✅ Ensure top_card stays accurate
-                await start_uno_game(interaction.client, self.game)
+                g.log(f"🃏 {name} drew a card and passed.")
+                g.advance_turn()
+                await start_uno_game(interaction.client, g, interaction)
 
         except Exception:
             print("[UNO ERROR] Draw button failed.")
@@ -1144,11 +2093,11 @@ class HandDropdown(Select):
         # Use unique values by appending index to duplicates
         options = []
         seen = {}
-        for i, card in enumerate(hand):
+        for i, card in enumerate(hand[:25]):  # Discord caps a select at 25 options
             count = seen.get(card, 0)
             seen[card] = count + 1
-            label = card
-            value = f"{card}|{count}" if count > 0 else card  # Add suffix if it's a duplicate
+            label = card_label(card)
+            value = f"{card}|{count}"  # Suffix keeps duplicates unique
             options.append(discord.SelectOption(label=label, value=value))
 
         super().__init__(placeholder="Select a card to play", min_values=1, max_values=1, options=options)
@@ -1156,14 +2105,16 @@ class HandDropdown(Select):
     async def callback(self, interaction):
         g = self.game
         try:
-            if interaction.user != g.current_player():
+            if g.ended or interaction.user != g.current_player():
                 return await interaction.response.send_message("❗ It’s not your turn.", ephemeral=True)
+            if g.pending_color or g.awaiting_uno:
+                return await interaction.response.send_message("❗ Finish your play first.", ephemeral=True)
 
-            # Get actual card value without the "|0", "|1" suffix
-            selected_raw = self.values[0].split("|")[0]
+            # Get actual card without the "|0", "|1" suffix
+            selected_raw = int(self.values[0].split("|")[0])
 
             # Validate
-            if not is_valid_play(selected_raw, g.pile[-1], g.draw_stack, g.color_override):
+            if not is_playable(selected_raw, g.pile[-1], g.draw_stack):
                 return await interaction.response.send_message("❌ Invalid move.", ephemeral=True)
 
             # Remove the first instance of that card in hand
@@ -1177,112 +2128,141 @@ class HandDropdown(Select):
             g.pile.append(selected_raw)
             g.top_card = selected_raw  # ✅ Update top card
             g.apply_card_effect(selected_raw)
+            g.log(f"🃏 {interaction.user.display_name} played **{card_label(selected_raw)}**")
 
-            if selected_raw in WILD_CARDS:
-                try:
-                    await interaction.response.defer()
-                except discord.errors.InteractionResponded:
-                    pass
-                await interaction.followup.send("🎨 Choose a color...", view=ColorSelectView(g, interaction.user), ephemeral=True)
-                return
+            if selected_raw in WILDS:
+                # The play finishes when the color is picked (or the turn timer picks one)
+                g.pending_color = interaction.user
+                return await interaction.response.send_message(
+                    "🎨 Choose a color...", view=ColorSelectView(g, interaction.user), ephemeral=True
+                )
 
+            await finish_play(interaction.client, g, interaction.user, interaction)
 
-            # UNO call logic
-            if len(g.hands[interaction.user]) == 1:
-                g.called_uno[interaction.user] = None  # They need to call it soon
+        except Exception:
+            print("[UNO ERROR] Failed inside HandDropdown callback.")
+            traceback.print_exc()
 
-                async def uno_timer():
-                    await asyncio.sleep(10)
-                    if g.called_uno.get(interaction.user) is None and len(g.hands[interaction.user]) == 1:
-                        g.hands[interaction.user].extend([g.deck.pop(), g.deck.pop()])
-                        await g.ctx.send(f"❗ **{interaction.user.display_name}** didn’t call UNO! Drew 2 cards and turn ended.")
-                    else:
-                        await g.ctx.send(f"✅ **{interaction.user.display_name}** called UNO in time!")
 
-                    g.advance_turn()
-                    await start_uno_game(interaction.client, g)
+async def finish_play(bot, game, player, interaction=None):
+    """After a card (and a wild's color) is down: end the game, open the UNO call window, or pass the turn."""
+    hand = game.hands[player]
+    if not hand:
+        return await game.end_game(player, interaction=interaction)
 
-                asyncio.create_task(uno_timer())
-                return
+    if len(hand) == 1:
+        # UNO call logic: the turn passes when they call it or the window closes
+        game.called_uno[player] = None
+        game.awaiting_uno = player
+        game.turn_ends = int(time.time()) + UNO_CALL_SECONDS
+        game.log(f"☝️ {player.display_name} has one card left! Type `uno` within {UNO_CALL_SECONDS}s.")
+        if game.timer_task and game.timer_task is not asyncio.current_task():
+            game.timer_task.cancel()
+        await show_uno_game(game, interaction)
+        game.uno_wait = games.track("uno", game.ctx.channel.id, asyncio.create_task(uno_call_window(bot, game, player)))
+        return
 
+    game.advance_turn()
+    await start_uno_game(bot, game, interaction)
 
-            elif len(g.hands[interaction.user]) == 0:
-                return await g.end_game(interaction.user)
 
-            g.advance_turn()
-            await start_uno_game(interaction.client, g)
+async def uno_call_window(bot, game, player):
+    try:
+        await asyncio.sleep(UNO_CALL_SECONDS)
+        game.awaiting_uno = None
+        if game.called_uno.get(player) is None and len(game.hands[player]) == 1:
+            game.draw(player, 2)
+            game.log(f"❗ **{player.display_name}** didn’t call UNO! Drew 2 cards.")
+        game.advance_turn()
+        await start_uno_game(bot, game)
+    except Exception:
+        print(f"[ERROR] in UNO call window for {player.display_name}")
+        traceback.print_exc()
 
-        except Exception:
-            print("[UNO ERROR] Failed inside HandDropdown callback.")
-            traceback.print_exc()
 
+async def call_uno(bot, game, player):
+    """`uno` typed in the channel: close the caller's window early, or penalise a false call."""
+    hand_size = len(game.hands.get(player, []))
+    if hand_size == 1:
+        if game.awaiting_uno == player and game.called_uno.get(player) is None:
+            game.called_uno[player] = True
+            game.awaiting_uno = None
+            if game.uno_wait:
+                game.uno_wait.cancel()
+            game.log(f"📢 **{player.display_name}** called **UNO!!**")
+            game.advance_turn()
+            await start_uno_game(bot, game)
+    elif hand_size > 1:
+        game.draw(player)
+        game.log(f"❌ **{player.display_name}** falsely called UNO and drew 1 penalty card.")
+        await show_uno_game(game)
+
+
+async def uno_turn_timer(bot, game, turn):
+    try:
+        await asyncio.sleep(UNO_TURN_SECONDS)
+        if game.ended or game.turn != turn:
+            return
+        p = game.current_player()
+
+        if game.pending_color == p:
+            # They played a wild and never picked, so pick for them
+            color = random.choice(COLOR_CHOICES)
+            game.pile[-1] = recolor(game.pile[-1], color)
+            game.top_card = game.pile[-1]
+            game.pending_color = None
+            game.log(f"⌛ {p.display_name} took too long to pick, so it's **{COLOR_EMOJIS[color]}**.")
+            return await finish_play(bot, game, p)
+
+        # Final check after timeout
+        if game.draw_stack > 0:
+            count = game.draw_stack
+            game.draw(p, count)
+            game.log(f"❗ {p.display_name} didn’t respond to the +2/+4 stack and drew **{count} cards**. Turn skipped.")
+            game.draw_stack = 0
+        else:
+            game.log(f"⌛ {p.display_name} took too long! Turn skipped.")
 
-async def start_uno_game(bot, game):
-    if game.skip_next:
-        game.skip_next = False
         game.advance_turn()
-        return await start_uno_game(bot, game)
-
-    try:
-        print(f"[UNO DEBUG] Starting UNO game for {len(game.players)} players.")
-        player = game.current_player()
-        game.color_override = None
-        print(f"[UNO DEBUG] Current player: {player.display_name}")
+        await start_uno_game(bot, game)
+    except Exception:
+        print(f"[ERROR] in turn_timer for turn {turn}")
+        traceback.print_exc()
 
-        embed = generate_game_embed(game)
-        view = View(timeout=None)
-        view.add_item(HandDropdown(game, game.current_player()))
-        view.add_item(DrawButton(game, game.current_player()))
 
-        game.message = await game.ctx.send(embed=embed, view=view)
+async def start_uno_game(bot, game, interaction=None):
+    """Turn driver: settle skips and forced draws, show the turn that's left, and start its timer.
 
-        # Turn timer
-        if hasattr(game, "timer_task") and game.timer_task:
-            game.timer_task.cancel()
-            
-        async def turn_timer(p):
-            try:
-                # If player is under draw stack pressure
-                if game.draw_stack > 0:
-                    playable = [c for c in game.hands[p] if is_valid_play(c, game.top_card, game.draw_stack)]
-                    if not playable:
-                        # No stackable +2/+4, draw immediately and skip
-                        drawn = [game.deck.pop() for _ in range(game.draw_stack)]
-                        game.hands[p].extend(drawn)
-                        await game.ctx.send(
-                            f"❗ {p.mention} has no +2/+4 to stack and draws **{game.draw_stack} cards**. Turn skipped."
-                        )
-                        game.draw_stack = 0
-                        game.advance_turn()
-                        await start_uno_game(bot, game)
-                        return  # Exit early
-                    # Else wait 30s and let them stack manually
-
-                # Countdown reminders
-                for seconds_left in [20, 10, 5]:
-                    await asyncio.sleep(30 - seconds_left)
-                    await game.ctx.send(f"⏳ {p.mention}, {seconds_left}s left to play...")
-
-                # Final check after timeout
-                if p == game.current_player():
-                    if game.draw_stack > 0:
-                        drawn = [game.deck.pop() for _ in range(game.draw_stack)]
-                        game.hands[p].extend(drawn)
-                        await game.ctx.send(
-                            f"❗ {p.mention} didn’t respond to +2/+4 stack and drew **{game.draw_stack} cards**. Turn skipped."
-                        )
-                        game.draw_stack = 0
-                    else:
-                        await game.ctx.send(f"⌛ {p.mention} took too long! Turn skipped.")
+    Skips and forced draws are resolved in a loop rather than by recursing, and
+    everything that happened lands on the game message in one edit.
+    """
+    if game.ended:
+        return
 
-                    game.advance_turn()
-                    await start_uno_game(bot, game)
-            except Exception as e:
-                print(f"[ERROR] in turn_timer for {p.display_name}")
-                traceback.print_exc()
+    try:
+        while True:
+            player = game.current_player()
+            if game.skip_next:
+                game.skip_next = False
+                game.log(f"⏭️ {player.display_name} is skipped.")
+            elif game.draw_stack and not playable_cards(game.hands[player], game.pile[-1], game.draw_stack):
+                # No stackable +2/+4, draw immediately and skip
+                count = game.draw_stack
+                game.draw(player, count)
+                game.draw_stack = 0
+                game.log(f"❗ {player.display_name} has no +2/+4 to stack and draws **{count} cards**. Turn skipped.")
+            else:
+                break
+            game.advance_turn()
 
+        print(f"[UNO DEBUG] Current player: {player.display_name}")
+        game.turn_ends = int(time.time()) + UNO_TURN_SECONDS
+        await show_uno_game(game, interaction)
 
-        game.timer_task = asyncio.create_task(turn_timer(player))
+        # Turn timer
+        if game.timer_task and game.timer_task is not asyncio.current_task():
+            game.timer_task.cancel()
+        game.timer_task = games.track("uno", game.ctx.channel.id, asyncio.create_task(uno_turn_timer(bot, game, game.turn)))
 
     except Exception:
         print("[UNO ERROR] Failed at game start.")
@@ -1290,6 +2270,108 @@ async def start_uno_game(bot, game):
 
 
 
+# ======================
+# === SCHEDULED JOBS ===
+# ======================
+# Each job knows how to compute its next due time from the previous one and
+# sleeps until then. scheduled_jobs holds the last due time that completed and,
+# while a run is in progress, a lease on it ({due, claimed_at}). A run is
+# claimed by taking the lease with a conditional update and only marked
+# complete after the job returns, so a run that fails is retried and one whose
+# process died is taken over once its lease expires. A run missed while the
+# bot was down is caught up once on startup. Jobs are passed the due time
+# they run for and must be safe to run again for it.
+
+JOB_LEASE_SECONDS = 600
+JOB_RETRY_SECONDS = 60
+
+class JobScheduler:
+    def __init__(self, collection):
+        self.collection = collection
+        self.jobs = {}   # name -> (next_due(after), func)
+        self.tasks = {}
+
+    def job(self, name, next_due):
+        """Register func as a job; next_due(after) returns the first due time strictly after `after`."""
+        def decorator(func):
+            self.jobs[name] = (next_due, func)
+            return func
+        return decorator
+
+    def start(self):
+        for name in self.jobs:
+            if name not in self.tasks or self.tasks[name].done():
+                self.tasks[name] = asyncio.create_task(self._run(name))
+
+    async def _first_due(self, name, next_due):
+        now = datetime.now(timezone.utc)
+        doc = await self.collection.find_one({"_id": name})
+        if doc is None:
+            # Never ran before: start from the next slot rather than firing right away
+            due = next_due(now)
+            await self.collection.update_one({"_id": name}, {"$setOnInsert": {"last_due": None, "next_due": due}}, upsert=True)
+            doc = await self.collection.find_one({"_id": name})
+        if doc.get("last_due") is None:
+            return None, doc["next_due"].replace(tzinfo=timezone.utc)
+        last_due = doc["last_due"].replace(tzinfo=timezone.utc)
+        return last_due, next_due(last_due)
+
+    async def _claim(self, name, last_due, due):
+        """Take the lease on the run after last_due; only one caller can win. Returns the lease time or None."""
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"_id": name, "last_due": last_due, "$or": [
+                {"running": None},
+                {"running.claimed_at": {"$lt": now - timedelta(seconds=JOB_LEASE_SECONDS)}},
+            ]},
+            {"$set": {"running": {"due": due, "claimed_at": now}}}
+        )
+        return now if result.modified_count == 1 else None
+
+    async def _finish(self, name, claimed_at, due=None):
+        """Drop our lease; with due, also record that run as complete."""
+        update = {"running": None}
+        if due is not None:
+            update["last_due"] = due
+        await self.collection.update_one({"_id": name, "running.claimed_at": claimed_at}, {"$set": update})
+
+    async def _run(self, name):
+        next_due, func = self.jobs[name]
+        await bot.wait_until_ready()
+        while True:
+            try:
+                last_due, due = await self._first_due(name, next_due)
+                now = datetime.now(timezone.utc)
+                if due > now:
+                    await asyncio.sleep((due - now).total_seconds())
+                    continue  # re-read the marker in case another instance ran it
+
+                # Several slots may have passed while we were down; run once for the latest
+                while next_due(due) <= now:
+                    due = next_due(due)
+                claimed_at = await self._claim(name, last_due, due)
+                if claimed_at is None:
+                    # Another instance holds the lease; check back for its result
+                    await asyncio.sleep(JOB_RETRY_SECONDS)
+                    continue
+                print(f"⏰ Running scheduled job {name} (due {due.isoformat()})")
+                try:
+                    await func(due)
+                except Exception:
+                    # Give the lease back so the same run is retried
+                    await self._finish(name, claimed_at)
+                    raise
+                await self._finish(name, claimed_at, due)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print(f"[ERROR] Scheduled job {name} failed.")
+                traceback.print_exc()
+                await asyncio.sleep(JOB_RETRY_SECONDS)
+
+job_scheduler = JobScheduler(scheduled_jobs)
+
+
 # ======================
 # === LOTTERY SYSTEM ===
 # ======================
@@ -1299,28 +2381,94 @@ lottery_timezone = pytz.timezone("America/Toronto")
 lottery_day = 6  # Sunday
 lottery_hour = 12
 lottery_minute = 0
+LOTTERY_REMINDER_INTERVAL = timedelta(hours=48)
+
+def next_lottery_draw(after):
+    """The first draw time (Sunday 12:00 Toronto) strictly after `after`."""
+    local = after.astimezone(lottery_timezone)
+    day = local.date() + timedelta(days=(lottery_day - local.weekday()) % 7)
+    while True:
+        due = lottery_timezone.localize(datetime(day.year, day.month, day.day, lottery_hour, lottery_minute))
+        if due > after:
+            return due.astimezone(timezone.utc)
+        day += timedelta(days=7)
+
+def next_lottery_reminder(after):
+    return after + LOTTERY_REMINDER_INTERVAL
+
+# The pool size lives in one bot_settings document, kept in step with every
+# ticket purchase and reset, so lotto and the reminder read it with a single
+# _id lookup instead of scanning ticket holders. sync() rebuilds it from the
+# users collection at startup in case a write was ever lost.
+
+class LotteryLedger:
+    def __init__(self, settings, users_collection):
+        self.settings = settings
+        self.users = users_collection
+
+    async def totals(self):
+        """Return (tickets sold, participants) for the current week."""
+        doc = await self.settings.find_one({"_id": "lottery_pool"}) or {}
+        return doc.get("tickets", 0), doc.get("participants", 0)
+
+    async def add(self, tickets, new_participant):
+        await self.settings.update_one(
+            {"_id": "lottery_pool"},
+            {"$inc": {"tickets": tickets, "participants": 1 if new_participant else 0}},
+            upsert=True
+        )
 
-lottery_cache = {
-    "last_reminder": None,
-    "last_draw": None
-}
+    async def reset(self):
+        await self.settings.update_one({"_id": "lottery_pool"}, {"$set": {"tickets": 0, "participants": 0}}, upsert=True)
+
+    def holders(self):
+        """Cursor over every ticket holder, served by the lottery_ticket_holders index."""
+        return self.users.find({"lottery_tickets": {"$gt": 0}}, {"lottery_tickets": 1})
+
+    async def sync(self):
+        totals = await self.users.aggregate([
+            {"$match": {"lottery_tickets": {"$gt": 0}}},
+            {"$group": {"_id": None, "tickets": {"$sum": "$lottery_tickets"}, "participants": {"$sum": 1}}}
+        ]).to_list(length=1)
+        tickets, participants = (totals[0]["tickets"], totals[0]["participants"]) if totals else (0, 0)
+        await self.settings.update_one(
+            {"_id": "lottery_pool"},
+            {"$set": {"tickets": tickets, "participants": participants}},
+            upsert=True
+        )
+
+lottery_ledger = LotteryLedger(bot_settings, users)
+
+def lottery_prize(tickets):
+    return LOTTERY_BASE_PRIZE + tickets * LOTTERY_BONUS_PER_TICKET
+
+class WeightedDraw:
+    """Weighted reservoir pick over (user_id, tickets) pairs, fed one at a time.
+
+    After each offer every user seen so far is the current winner with
+    probability tickets / total, so the result matches drawing one ticket at
+    random without ever expanding tickets into a list. The same seed and the
+    same order of offers always give the same winner.
+    """
 
-lottery_started = False  # Ensures the loop starts only once
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.winner = None
+        self.total = 0
+
+    def offer(self, user_id, tickets):
+        self.total += tickets
+        if self.rng.random() * self.total < tickets:
+            self.winner = user_id
 
 @bot.command(aliases=["lottery"])
 async def lotto(ctx):
-    user = await get_user(ctx.author.id)
-    now = datetime.now(lottery_timezone)
-    next_draw = now.replace(hour=lottery_hour, minute=lottery_minute, second=0, microsecond=0)
-    if now.weekday() > lottery_day or (now.weekday() == lottery_day and now.time() >= next_draw.time()):
-        next_draw += timedelta(days=(7 - now.weekday() + lottery_day) % 7)
-    elif now.weekday() < lottery_day:
-        next_draw += timedelta(days=(lottery_day - now.weekday()))
+    user = await get_user(ctx.author.id, ["lottery_tickets"]) or {}
+    next_draw = next_lottery_draw(datetime.now(timezone.utc))
 
     tickets = user.get("lottery_tickets", 0)
-    buyers = await users.find({"lottery_tickets": {"$gt": 0}}).to_list(length=100)
-    total_tickets = sum(u.get("lottery_tickets", 0) for u in buyers)
-    pool = 50000 + total_tickets * 25000
+    total_tickets, _ = await lottery_ledger.totals()
+    pool = lottery_prize(total_tickets)
 
     embed = discord.Embed(title="🎟️ Weekly Lottery", color=discord.Color.gold())
     embed.add_field(name="Next Draw", value=f"<t:{int(next_draw.timestamp())}:R>", inline=False)
@@ -1335,7 +2483,7 @@ async def lottobuy(ctx, amount: int):
     if amount < 1 or amount > 5:
         return await ctx.send("❗ You can buy between 1 and 5 tickets.")
 
-    user = await get_user(ctx.author.id)
+    user = await get_user(ctx.author.id, ["wallet", "lottery_tickets"]) or {}
     current = user.get("lottery_tickets", 0)
     if current >= 5:
         return await ctx.send("❌ You already own 5 tickets this week.")
@@ -1370,72 +2518,138 @@ async def lottobuy(ctx, amount: int):
     await view.wait()
 
     if view.result:
-        await update_user(ctx.author.id, {"$inc": {"wallet": -total_price, "lottery_tickets": amount}})
+        bought = await debit_wallet(
+            ctx.author.id, total_price,
+            inc={"lottery_tickets": amount},
+            guard={"lottery_tickets": {"$not": {"$gt": LOTTERY_MAX_TICKETS - amount}}},
+            fields=("wallet", "lottery_tickets")
+        )
+        if not bought:
+            return await ctx.send("❌ Purchase failed — not enough 🥖 or you'd go over 5 tickets.")
+        await lottery_ledger.add(amount, new_participant=bought.get("lottery_tickets") == amount)
         await ctx.send(f"✅ You bought {amount} ticket(s)!")
     else:
         await ctx.send("❌ Purchase cancelled.")
 
-async def run_lottery_draw():
-    buyers = await users.find({"lottery_tickets": {"$gt": 0}}).to_list(length=100)
-    entries = []
-    for u in buyers:
-        entries.extend([u["_id"]] * u.get("lottery_tickets", 0))
-
-    channel = bot.get_channel(1398586067967414323)
-    if entries:
-        winner_id = random.choice(entries)
-        winner = await bot.fetch_user(int(winner_id))
-        prize = 50000 + len(entries) * 25000
-        await users.update_one({"_id": str(winner_id)}, {"$inc": {"wallet": prize}})
-        await channel.send(f"🏆 Congratulations {winner.mention}! You won {prize} 🥖 from this week's lottery!")
-    else:
-        await channel.send("😞 No entries this week. Lottery cancelled.")
+async def run_lottery_draw(due=None):
+    """Draw, pay and reset the lottery for the slot due at `due`.
 
-    await users.update_many({}, {"$set": {"lottery_tickets": 0}})
-    lottery_cache["last_draw"] = datetime.now(lottery_timezone)
+    Safe to run again for the same slot: the draw is recorded (keyed by due)
+    before anything is paid, a re-run picks up that record instead of drawing
+    again, and the payout and ticket take-back are each conditional on a
+    per-user marker so they apply once. Forced draws get a fresh key.
+    """
+    key = due.isoformat() if due else f"forced:{datetime.now(timezone.utc).isoformat()}"
+    record = await lottery_draws.find_one({"_id": key})
+    if record is None:
+        seed = random.SystemRandom().getrandbits(63)  # fits a BSON int64
+        draw = WeightedDraw(seed)
+        participants = []  # (user_id, tickets), kept for the history record
+        # Sorted by _id so the draw can be replayed from its history record
+        async for u in lottery_ledger.holders().sort("_id", 1):
+            draw.offer(u["_id"], u["lottery_tickets"])
+            participants.append((u["_id"], u["lottery_tickets"]))
+        winner_id, total_tickets = draw.winner, draw.total
+        record = {
+            "_id": key,
+            "drawn_at": datetime.now(timezone.utc),
+            "seed": seed,
+            "participants": [{"user": uid, "tickets": tickets} for uid, tickets in participants],
+            "tickets": total_tickets,
+            "pool": lottery_prize(total_tickets) if winner_id else 0,
+            "winner": winner_id,
+            "announced": False,
+        }
+        try:
+            await lottery_draws.insert_one(record)
+        except DuplicateKeyError:
+            # Another run for this slot got there first; finish its draw instead
+            record = await lottery_draws.find_one({"_id": key})
+
+    winner_id, prize = record["winner"], record["pool"]
+    if winner_id:
+        await users.update_one(
+            {"_id": winner_id, "lottery_paid": {"$ne": key}},
+            {"$inc": {"wallet": prize}, "$set": {"lottery_paid": key}}
+        )
+
+    # Take back exactly the tickets that were drawn, so anything bought while
+    # the draw ran carries over instead of being wiped
+    if record["participants"]:
+        await users.bulk_write(
+            [UpdateOne({"_id": p["user"], "lottery_drawn": {"$ne": key}},
+                       {"$inc": {"lottery_tickets": -p["tickets"]}, "$set": {"lottery_drawn": key}})
+             for p in record["participants"]],
+            ordered=False
+        )
+    await lottery_ledger.sync()
+
+    if not record.get("announced", True):
+        channel = bot.get_channel(LOTTERY_CHANNEL_ID)
+        if channel is None:
+            raise RuntimeError(f"Lottery channel {LOTTERY_CHANNEL_ID} not found")
+        if winner_id:
+            await channel.send(f"🏆 Congratulations <@{winner_id}>! You won {prize} 🥖 from this week's lottery!")
+        else:
+            await channel.send("😞 No entries this week. Lottery cancelled.")
+        await lottery_draws.update_one({"_id": key}, {"$set": {"announced": True}})
+
+def replay_lottery_draw(draw):
+    """Re-run a recorded draw from its seed; returns the winner it should have had."""
+    replay = WeightedDraw(draw["seed"])
+    for p in draw.get("participants", []):
+        replay.offer(p["user"], p["tickets"])
+    return replay.winner
+
+@bot.command()
+async def lottohistory(ctx, count: int = 5):
+    if ctx.author.id not in CREATOR_IDS:
+        return await ctx.send("❌ Only the bot owner can view lottery history.")
+
+    draws = await lottery_draws.find().sort("drawn_at", -1).limit(max(1, min(count, 10))).to_list(length=10)
+    if not draws:
+        return await ctx.send("📭 No lottery draws recorded yet.")
+
+    embed = discord.Embed(title="📜 Lottery History", color=discord.Color.gold())
+    for draw in draws:
+        verified = "✅" if replay_lottery_draw(draw) == draw.get("winner") else "⚠️ replay mismatch"
+        winner = f"<@{draw['winner']}>" if draw.get("winner") else "No entries"
+        embed.add_field(
+            name=draw["drawn_at"].strftime("%Y-%m-%d %H:%M UTC"),
+            value=(f"Winner: {winner} — {draw.get('pool', 0):,} 🥖\n"
+                   f"{len(draw.get('participants', []))} player(s), {draw.get('tickets', 0)} 🎟️ — seed `{draw['seed']}` {verified}"),
+            inline=False
+        )
+    await ctx.send(embed=embed)
 
 @bot.command()
 async def forcelotto(ctx):
     if ctx.author.id not in CREATOR_IDS:
         return await ctx.send("❌ Only the bot owner can force a lottery draw.")
 
-    await perform_lottery_draw()
+    await run_lottery_draw()
     await ctx.send("🎯 Forced lottery draw executed.")
 
-@tasks.loop(minutes=1)
-async def lottery_check():
-    now = datetime.now(lottery_timezone)
-
-    # === Reminder every 48h ===
-    if (lottery_cache["last_reminder"] is None or
-        (now - lottery_cache["last_reminder"]).total_seconds() >= 48 * 3600):
-        buyers = await users.find({"lottery_tickets": {"$gt": 0}}).to_list(length=100)
-        if buyers:
-            total_tickets = sum(u.get("lottery_tickets", 0) for u in buyers)
-            pool = 50000 + total_tickets * 25000
-            lines = [f"<@{u['_id']}>: {u['lottery_tickets']} 🎟️" for u in buyers]
-            embed = discord.Embed(title="⏳ Lottery Reminder", color=discord.Color.orange())
-            embed.add_field(name="Prize Pool", value=f"{pool} 🥖", inline=False)
-            embed.add_field(name="Participants", value="\n".join(lines), inline=False)
-            embed.set_footer(text="Use ;lotto to check your tickets or ;lotto buy <amount> to join! Maximum of 5 tickets per participant!")
-
-            channel = bot.get_channel(LOTTERY_CHANNEL_ID)
-            if channel:
-                await channel.send(embed=embed)
-            else:
-                print(f"[WARNING] Lottery reminder failed: Channel {LOTTERY_CHANNEL_ID} not found.")
-
-            lottery_cache["last_reminder"] = now
+# === Reminder every 48h ===
+@job_scheduler.job("lottery_reminder", next_lottery_reminder)
+async def send_lottery_reminder(due=None):
+    total_tickets, participants = await lottery_ledger.totals()
+    if not participants:
+        return
+    pool = lottery_prize(total_tickets)
+    embed = discord.Embed(title="⏳ Lottery Reminder", color=discord.Color.orange())
+    embed.add_field(name="Prize Pool", value=f"{pool} 🥖", inline=False)
+    embed.add_field(name="Participants", value=f"{participants} player(s) holding {total_tickets} 🎟️", inline=False)
+    embed.set_footer(text="Use ;lotto to check your tickets or ;lotto buy <amount> to join! Maximum of 5 tickets per participant!")
 
-    # === Draw time ===
-    if now.weekday() == lottery_day and now.hour == lottery_hour and now.minute == lottery_minute:
-        if lottery_cache["last_draw"] and lottery_cache["last_draw"].date() == now.date():
-            return
-        await run_lottery_draw()
+    channel = bot.get_channel(LOTTERY_CHANNEL_ID)
+    if channel:
+        await channel.send(embed=embed)
+    else:
+        print(f"[WARNING] Lottery reminder failed: Channel {LOTTERY_CHANNEL_ID} not found.")
 
-@lottery_check.before_loop
-async def before_lottery():
-    await bot.wait_until_ready()
+# === Draw time ===
+job_scheduler.job("lottery_draw", next_lottery_draw)(run_lottery_draw)
 
 
 # ============================
@@ -1443,32 +2657,16 @@ async def before_lottery():
 # ============================
 
 @bot.command(aliases=["th"])
+@cooldown("treasurehunt", 86400, "⏳ You must wait {time} before digging again.")
 async def treasurehunt(ctx):
     user_id = str(ctx.author.id)
-    now = datetime.utcnow()
 
-    # Always fetch fresh
-    user_data = await users.find_one({"_id": user_id})
-    if not user_data:
-        await users.insert_one({"_id": user_id, "wallet": 0, "bank": 0})
-        user_data = await users.find_one({"_id": user_id})
+    user_data = await ensure_user(user_id)
 
     # Read target scope **after** confirming user exists
     has_target_scope = user_data.get("active_buffs", {}).get("target_scope", False)
     digs_allowed = 2 if has_target_scope else 1
 
-    # Cooldown check
-    cooldowns_data = user_data.get("cooldowns", {})
-    last_used = cooldowns_data.get("treasurehunt")
-    if last_used:
-        if isinstance(last_used, str):
-            last_used = datetime.fromisoformat(last_used)
-        elapsed = (now - last_used).total_seconds()
-        if elapsed < 86400:
-            hours = int((86400 - elapsed) // 3600)
-            minutes = int(((86400 - elapsed) % 3600) // 60)
-            return await ctx.send(f"⏳ You must wait {hours}h {minutes}m before digging again.")
-
     prizes = [
         ("👑", 1000000, 0.0005),
         ("💎", 100000, 0.01),
@@ -1519,10 +2717,13 @@ async def treasurehunt(ctx):
                 await interaction.response.edit_message(view=self.view)
 
                 if value == "death":
-                    await users.update_one({"_id": user_id}, {"$set": {"wallet": 0}})
+                    await users.update_one(
+                        {"_id": user_id},
+                        [{"$set": {"wallet": 0, "net_worth": {"$ifNull": ["$bank", 0]}}}]
+                    )
                     await ctx.send("💀 Haha, you dug your own grave and tripped. You died and lost all your bread loser.")
                 elif value == "weekly_reset":
-                    await users.update_one({"_id": user_id}, {"$unset": {"cooldowns.weekly": ""}})
+                    await cooldown_store.clear(user_id, ["weekly"])
                     await ctx.send(f"🔑 You found a **Key**! Your `;weekly` cooldown has been reset.")
                 elif value > 0:
                     await users.update_one({"_id": user_id}, {"$inc": {"wallet": value}})
@@ -1532,7 +2733,6 @@ async def treasurehunt(ctx):
                     await ctx.send(f"💥 You hit a {emoji} and **lost {-value:,} 🥖!**")
 
                 if self.parent.digs_done == self.parent.digs_allowed:
-                    await users.update_one({"_id": user_id}, {"$set": {"cooldowns.treasurehunt": now}})
                     if has_target_scope:
                         await users.update_one({"_id": user_id}, {"$unset": {"active_buffs.target_scope": ""}})
 
@@ -1576,40 +2776,28 @@ async def disable(ctx, command_name: str):
     if command_name in ["enable", "disable"]:
         return await ctx.send("❌ You cannot disable this command.")
     
-    settings = await bot_settings.find_one({"_id": "disabled_commands"}) or {}
-    disabled = settings.get("commands", [])
-    if command_name in disabled:
+    await settings_cache.ensure_loaded()
+    if command_name in settings_cache.disabled_commands:
         return await ctx.send("⚠️ Command is already disabled.")
 
-    disabled.append(command_name)
-    await bot_settings.update_one(
-        {"_id": "disabled_commands"},
-        {"$set": {"commands": disabled}},
-        upsert=True
-    )
+    await settings_cache.disable_command(command_name)
     await ctx.send(f"🔒 Command `{command_name}` has been disabled.")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def enable(ctx, command_name: str):
-    settings = await bot_settings.find_one({"_id": "disabled_commands"}) or {}
-    disabled = settings.get("commands", [])
-    if command_name not in disabled:
+    await settings_cache.ensure_loaded()
+    if command_name not in settings_cache.disabled_commands:
         return await ctx.send("⚠️ Command is not disabled.")
 
-    disabled.remove(command_name)
-    await bot_settings.update_one(
-        {"_id": "disabled_commands"},
-        {"$set": {"commands": disabled}},
-        upsert=True
-    )
+    await settings_cache.enable_command(command_name)
     await ctx.send(f"🔓 Command `{command_name}` has been enabled.")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
 async def disabled(ctx):
-    settings = await bot_settings.find_one({"_id": "disabled_commands"}) or {}
-    disabled = settings.get("commands", [])
+    await settings_cache.ensure_loaded()
+    disabled = sorted(settings_cache.disabled_commands)
     if not disabled:
         return await ctx.send("✅ No commands are currently disabled.")
     await ctx.send(f"🚫 Disabled commands:\n`{', '.join(disabled)}`")
@@ -1641,14 +2829,13 @@ async def resetall(ctx):
                     "$set": {"wallet": 0, "bank": 0},
                     "$unset": {
                         "cooldowns": "",
-                        "cooldowns.hangman": "",
                         "stats": ""
                     }
                 }
             )
+            await cooldown_store.clear_all()
             # Clear in-memory leaderboards and games
-            active_trivia.clear()
-            trivia_answers.clear()
+            games.end_all("trivia")
 
             await interaction.response.edit_message(
                 content=(
@@ -1683,90 +2870,56 @@ async def give(ctx, member: discord.Member, amount: int):
     if amount <= 0:
         return await ctx.send("❗ Enter a positive amount.")
 
-    author_data = users.find_one({"_id": str(ctx.author.id)})
-    if not author_data or author_data.get("wallet", 0) < amount:
+    if not await transfer_wallet(ctx.author.id, member.id, amount):
         return await ctx.send("❗ You don't have enough 🥖.")
 
-    users.update_one({"_id": str(ctx.author.id)}, {"$inc": {"wallet": -amount}})
-    users.update_one({"_id": str(member.id)}, {"$inc": {"wallet": amount}}, upsert=True)
     await ctx.send(f"✅ Gave {amount} 🥖 to {member.display_name}.")
 
 @bot.command()
+@cooldown("work", 3600, "⏳ Come back in {time} to work again!")
 async def work(ctx):
     await ensure_user(ctx.author.id)
-    on_cd, remaining = await is_on_cooldown(ctx.author.id, 'work', 3600)
-    if on_cd:
-        return await ctx.send(f"⏳ Come back in {remaining // 60}m {remaining % 60}s to work again!")
-
     earnings = random.randint(1000, 5000)
-    await increment_user(ctx.author.id, "wallet", earnings)
-
-    # ✅ Set cooldown after reward
-    await users.update_one(
-        {"_id": str(ctx.author.id)},
-        {"$set": {"cooldowns.work": datetime.utcnow().isoformat()}}
-    )
+    queue_wallet_credit(ctx.author.id, earnings)
 
     await ctx.send(f"💼 You worked and earned 🥖 {earnings}!")
 
     
 @bot.command()
+@cooldown("daily", 86400, "⏳ Daily already claimed! Wait {time}.")
 async def daily(ctx):
     await ensure_user(ctx.author.id)
-    on_cd, remaining = await is_on_cooldown(ctx.author.id, 'daily', 86400)
-    if on_cd:
-        return await ctx.send(f"⏳ Daily already claimed! Wait {remaining // 3600}h {remaining % 3600 // 60}m.")
-
     earnings = random.randint(5000, 10000)
-    await increment_user(ctx.author.id, "wallet", earnings)
-
-    # ✅ Set cooldown after giving reward
-    await users.update_one(
-        {"_id": str(ctx.author.id)},
-        {"$set": {"cooldowns.daily": datetime.utcnow().isoformat()}}
-    )
+    queue_wallet_credit(ctx.author.id, earnings)
 
     await ctx.send(f"📆 You claimed your daily reward of 🥖 {earnings}!")
 
 
 @bot.command()
+@cooldown("weekly", 604800, "⏳ Weekly already claimed! Wait **{time}**.")
 async def weekly(ctx):
     await ensure_user(ctx.author.id)
-    on_cd, remaining = await is_on_cooldown(ctx.author.id, 'weekly', 604800)
-    if on_cd:
-        days, rem = divmod(remaining, 86400)
-        hours = rem // 3600
-        return await ctx.send(f"⏳ Weekly already claimed! Wait **{days}d {hours}h**.")
-
     earnings = random.randint(10000, 20000)
-    await increment_user(ctx.author.id, "wallet", earnings)
-
-    # ✅ Set the cooldown timestamp
-    await users.update_one(
-        {"_id": str(ctx.author.id)},
-        {"$set": {"cooldowns.weekly": datetime.utcnow().isoformat()}}
-    )
+    queue_wallet_credit(ctx.author.id, earnings)
 
     await ctx.send(f"🧾 You claimed your weekly bonus of 🥖 {earnings}!")
 
 
 @bot.command()
+@cooldown("rob", 3600, "⏳ Wait {time} to rob again.")
 async def rob(ctx, target: discord.Member):
     if target.id == ctx.author.id:
+        await refund_cooldown(ctx)
         return await ctx.send("❌ You can't rob yourself, dumbass.")
 
     await ensure_user(ctx.author.id)
     await ensure_user(target.id)
 
-    now = datetime.utcnow()
-    on_cd, remaining = await is_on_cooldown(ctx.author.id, 'rob', 3600)
-    if on_cd:
-        return await ctx.send(f"⏳ Wait {remaining // 60}m {remaining % 60}s to rob again.")
+    robber = await get_user(ctx.author.id, ["buffs.gun"])
+    victim = await get_user(target.id, ["wallet"])
 
-    robber = await users.find_one({"_id": str(ctx.author.id)})
-    victim = await users.find_one({"_id": str(target.id)})
-
-    if victim["wallet"] <= 0:
+    if victim.get("wallet", 0) <= 0:
+        await refund_cooldown(ctx)
         return await ctx.send("❌ That user has no 🥖 to steal.")
 
     if robber.get("buffs", {}).get("gun"):
@@ -1793,11 +2946,6 @@ async def rob(ctx, target: discord.Member):
         ]
         await ctx.send(random.choice(roast_lines))
 
-    await users.update_one(
-    {"_id": str(ctx.author.id)},
-    {"$set": {"cooldowns.rob": now.isoformat()}}
-)
-
 
 # Helper to format cooldown display
 def format_cd(name, last_ts, cd_sec, now):
@@ -1830,51 +2978,16 @@ def format_cd(name, last_ts, cd_sec, now):
 @bot.command(name="cooldowns", aliases=["cd"])
 async def cooldowns_cmd(ctx):
     """Displays active cooldowns with pagination for commands and items."""
-    await ensure_user(ctx.author.id)
-    user = await users.find_one({"_id": str(ctx.author.id)}) or {}
-    cds = user.get("cooldowns", {})
-    now = datetime.utcnow()
+    # One lookup covers every timer, commands and items alike
+    cds = await cooldown_store.active(ctx.author.id)
 
-    def format_cd(name, last_time, duration, now_time):
-        if not last_time:
-            return f"{name} — ✅ Ready"
-        if isinstance(last_time, str):
-            try:
-                last_time = datetime.fromisoformat(last_time)
-            except ValueError:
-                return f"{name} — ❓ Error"
-        elapsed = (now_time - last_time).total_seconds()
-        if elapsed >= duration:
+    def format_cd(name, remaining):
+        if not remaining:
             return f"{name} — ✅ Ready"
-        remaining = int(duration - elapsed)
-        if name == "weekly":
-            d, rem = divmod(remaining, 86400)
-            h, rem = divmod(rem, 3600)
-            m = rem // 60
-            parts = []
-            if d:
-                parts.append(f"{d}d")
-            if h:
-                parts.append(f"{h}h")
-            if m or not parts:
-                parts.append(f"{m}m")
-            return f"{name} — ⏳ `{' '.join(parts)}`"
-        else:
-            h, rem = divmod(remaining, 3600)
-            m = rem // 60
-            return f"{name} — ⏳ `{h}h {m}m`"
-
+        return f"{name} — ⏳ `{format_cooldown(remaining)}`"
 
     # === Page 1: Command/Game cooldowns ===
-    cd_definitions = {
-        "work":    3600,
-        "daily":   86400,
-        "weekly":  604800,
-        "rob":     3600,
-        "trivia":  86400,
-        "hangman": 10800,
-    }
-    command_lines = [format_cd(cmd, cds.get(cmd), dur, now) for cmd, dur in cd_definitions.items()]
+    command_lines = [format_cd(cmd, cds.get(cmd)) for cmd in COOLDOWNS]
     command_embed = discord.Embed(
         title="⌛ Your Cooldowns — Commands & Games",
         description="\n".join(command_lines),
@@ -1882,22 +2995,13 @@ async def cooldowns_cmd(ctx):
     )
 
     # === Page 2: Item usage cooldowns ===
-    item_usage = cds.get("item_usage", {})
     item_lines = []
-    for item_name, last_used in item_usage.items():
-        if isinstance(last_used, str):
-            try:
-                last_used = datetime.fromisoformat(last_used)
-            except ValueError:
-                continue
-        elapsed = (now - last_used).total_seconds()
-        if elapsed >= 86400:
-            item_lines.append(f"{item_name} — ✅ Ready")
-        else:
-            remaining = int(86400 - elapsed)
-            h, rem = divmod(remaining, 3600)
-            m = rem // 60
-            item_lines.append(f"{item_name} — ⏳ `{h}h {m}m`")
+    for name, remaining in cds.items():
+        if not name.startswith("item:"):
+            continue
+        h, rem = divmod(remaining, 3600)
+        m = rem // 60
+        item_lines.append(f"{name[len('item:'):]} — ⏳ `{h}h {m}m`")
 
     item_embed = discord.Embed(
         title="🧃 Your Cooldowns — Items",
@@ -1936,8 +3040,8 @@ async def cooldowns_cmd(ctx):
 
 @bot.command(aliases=["with"])
 async def withdraw(ctx, amount: int):
-    user_data = await get_user(ctx.author.id)
-    bank = user_data["bank"]
+    user_data = await get_user(ctx.author.id, ["wallet", "bank"]) or {}
+    bank = user_data.get("bank", 0)
 
     if amount <= 0:
         return await ctx.send("❌ Amount must be positive.")
@@ -1957,7 +3061,7 @@ async def withdraw(ctx, amount: int):
 
 @bot.command(aliases=["dep"])
 async def deposit(ctx, amount: int):
-    user_data = await get_user(ctx.author.id)
+    user_data = await get_user(ctx.author.id, ["wallet", "bank"]) or {}
     wallet = user_data.get("wallet", 0)
     bank = user_data.get("bank", 0)
     max_deposit = wallet // 2
@@ -1989,7 +3093,7 @@ async def deposit(ctx, amount: int):
 
 @bot.command(aliases=["depmax", "depall", "depositall"])
 async def depositmax(ctx):
-    user_data = await get_user(ctx.author.id)
+    user_data = await get_user(ctx.author.id, ["wallet", "bank"]) or {}
     wallet = user_data.get("wallet", 0)
     bank = user_data.get("bank", 0)
 
@@ -2015,23 +3119,195 @@ async def depositmax(ctx):
     await ctx.send(f"🏦 {ctx.author.mention} deposited {max_deposit} 🥖 (50% of your wallet) into the bank.")
 
 
+# ============================
+# DISPLAY NAME RESOLVER
+# ============================
+# Leaderboards need a name for every ranked user. Members of the bot's guilds
+# come straight from the gateway cache, recently seen names from a local TTL
+# cache, and only the rest go to the REST API, fetched concurrently under a
+# small semaphore so a page of unknown users doesn't trip the rate limit.
+
+NAME_CACHE_TTL = 3600  # seconds
+NAME_CACHE_SIZE = 10000
+NAME_FETCH_CONCURRENCY = 5
+
+class NameResolver:
+    def __init__(self, ttl=NAME_CACHE_TTL, concurrency=NAME_FETCH_CONCURRENCY):
+        self.ttl = ttl
+        self._names = OrderedDict()  # user_id -> (expires, name)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _remember(self, user_id, name):
+        self._names[user_id] = (time.monotonic() + self.ttl, name)
+        self._names.move_to_end(user_id)
+        while len(self._names) > NAME_CACHE_SIZE:
+            self._names.popitem(last=False)
+
+    def _cached(self, guilds, user_id):
+        for guild in guilds:
+            member = guild.get_member(user_id)
+            if member:
+                self._remember(user_id, member.display_name)
+                return member.display_name
+        entry = self._names.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        user = bot.get_user(user_id)
+        if user:
+            self._remember(user_id, user.display_name)
+            return user.display_name
+        return None
+
+    async def _fetch(self, user_id):
+        async with self._semaphore:
+            try:
+                name = (await bot.fetch_user(user_id)).display_name
+            except discord.HTTPException:
+                # Not remembered, so a transient failure is retried next time
+                return f"User {user_id}"
+        self._remember(user_id, name)
+        return name
+
+    async def resolve(self, guilds, user_ids):
+        """Return {user_id: display name} for every id, calling Discord only for unknown users.
+
+        guilds is a guild or a list of them whose member caches are checked first.
+        """
+        if isinstance(guilds, discord.Guild):
+            guilds = [guilds]
+        guilds = guilds or []
+        names = {}
+        missing = []
+        for user_id in map(int, user_ids):
+            name = self._cached(guilds, user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            names.update(zip(missing, fetched))
+        return names
+
+name_resolver = NameResolver()
+
+# ============================
+# LEADERBOARD SNAPSHOTS
+# ============================
+# Each board keeps its last top-N query and the embed rendered from it. Writes
+# to users mark the boards whose field they touch as dirty; a dirty board is
+# rebuilt on its next view, but at most once per LEADERBOARD_MIN_REFRESH, and
+# every board is rebuilt after LEADERBOARD_MAX_AGE regardless. In between,
+# the commands send the cached embed without touching Mongo.
+
+LEADERBOARD_MIN_REFRESH = 15  # seconds
+LEADERBOARD_MAX_AGE = 300     # seconds
+
+def _render_net_worth(i, name, user):
+    return f"{i}. {name}", f"Total 🥖: {user.get('net_worth', 0)}"
+
+def _render_game(game):
+    def render(i, name, user):
+        stats = user.get("stats", {}).get(game, {})
+        return f"{i}. {name}", f"Wins: {stats.get('wins', 0)}, Losses: {stats.get('losses', 0)}"
+    return render
+
+def _render_trivia(i, name, user):
+    return f"{i}. {name}", f"Points: {user.get('stats', {}).get('trivia', {}).get('points', 0):,}"
+
+class Leaderboard:
+    def __init__(self, title, field, projection, size=10, render=None, color=discord.Color.gold()):
+        self.title = title
+        self.field = field
+        self.projection = projection
+        self.size = size
+        self.render = render
+        self.color = color
+        self.embed = None
+        self.built_at = 0
+        self.dirty = True
+        self.lock = asyncio.Lock()
+
+    def touched_by(self, path):
+        return path == self.field or self.field.startswith(path + ".") or path.startswith(self.field + ".")
+
+    async def rebuild(self):
+        await wallet_writer.barrier()
+        # Everything except wallet/net_worth sorts on a sparse index, which Mongo
+        # only uses when the filter excludes documents missing the field
+        query = {} if self.field in ("wallet", "net_worth") else {self.field: {"$exists": True}}
+        self.dirty = False
+        ranked = await users.find(query, self.projection).sort(self.field, -1).limit(self.size).to_list(length=self.size)
+        # Boards are shared by every server, so any guild the bot can see may know the member
+        names = await name_resolver.resolve(bot.guilds, [u["_id"] for u in ranked])
+
+        if self.render:
+            embed = discord.Embed(title=self.title, color=self.color)
+            for i, user in enumerate(ranked, 1):
+                name, value = self.render(i, names[int(user["_id"])], user)
+                embed.add_field(name=name, value=value, inline=False)
+        else:
+            lines = [f"**{i}.** {names[int(u['_id'])]} - 🥖 {u.get(self.field, 0):,}" for i, u in enumerate(ranked, 1)]
+            embed = discord.Embed(title=self.title, description="\n".join(lines), color=self.color)
+        self.embed = embed
+        self.built_at = time.monotonic()
+
+    async def get_embed(self):
+        async with self.lock:
+            age = time.monotonic() - self.built_at
+            if self.embed is None or age >= LEADERBOARD_MAX_AGE or (self.dirty and age >= LEADERBOARD_MIN_REFRESH):
+                await self.rebuild()
+            return self.embed
+
+class LeaderboardService:
+    def __init__(self, boards):
+        self.boards = boards
+
+    def on_write(self, update):
+        if not isinstance(update, dict):
+            # Pipelines, deletes and bulk writes could have changed anything
+            for board in self.boards.values():
+                board.dirty = True
+            return
+        paths = [path for fields in update.values() if isinstance(fields, dict) for path in fields]
+        for board in self.boards.values():
+            if not board.dirty and any(board.touched_by(path) for path in paths):
+                board.dirty = True
+
+    async def get_embed(self, key):
+        return await self.boards[key].get_embed()
+
+leaderboards = LeaderboardService({
+    "networth": Leaderboard("🏆 Leaderboard", "net_worth", {"net_worth": 1}, render=_render_net_worth),
+    "wallet": Leaderboard("🏆 Top 20 Richest Users", "wallet", {"wallet": 1}, size=20, color=0xFFD700),
+    "tictactoe": Leaderboard("🏆 Tic-Tac-Toe Leaderboard", "stats.tictactoe.wins", {"stats.tictactoe": 1},
+                             render=_render_game("tictactoe"), color=discord.Color.blue()),
+    "connect4": Leaderboard("🏆 Connect 4 Leaderboard", "stats.connect4.wins", {"stats.connect4": 1},
+                            render=_render_game("connect4"), color=discord.Color.blue()),
+    "rps": Leaderboard("🏆 Rock Paper Scissors Leaderboard", "stats.rps.wins", {"stats.rps": 1},
+                       render=_render_game("rps"), color=discord.Color.blue()),
+    "blackjack": Leaderboard("🏆 Blackjack Leaderboard", "stats.blackjack.wins", {"stats.blackjack": 1},
+                             render=_render_game("blackjack"), color=discord.Color.blue()),
+    "trivia": Leaderboard("🏆 Trivia Leaderboard", "stats.trivia.points", {"stats.trivia.points": 1},
+                          render=_render_trivia, color=discord.Color.purple()),
+})
+users.listeners.append(leaderboards.on_write)
+
 # ============================
 # COMMAND: LEADERBOARD
 # ============================
 
 @bot.command()
 async def leaderboard(ctx):
-    users = await users_collection.find().to_list(length=100)
-    sorted_users = sorted(users, key=lambda u: u.get("wallet", 0) + u.get("bank", 0), reverse=True)[:10]
-
-    embed = discord.Embed(title="🏆 Leaderboard", color=discord.Color.gold())
-    for i, user in enumerate(sorted_users, start=1):
-        member = await bot.fetch_user(int(user["_id"]))
-        total = user.get("wallet", 0) + user.get("bank", 0)
-        embed.add_field(name=f"{i}. {member.display_name}",
-                        value=f"Total 🥖: {total}",
-                        inline=False)
-    await ctx.send(embed=embed)
+    await ctx.send(embed=await leaderboards.get_embed("networth"))
+
+@bot.command()
+async def gamelb(ctx, game: str):
+    game = game.lower()
+    if game in ("networth", "wallet") or game not in leaderboards.boards:
+        choices = ", ".join(k for k in leaderboards.boards if k not in ("networth", "wallet"))
+        return await ctx.send(f"❌ Unknown game. Choose one of: {choices}")
+    await ctx.send(embed=await leaderboards.get_embed(game))
 
 # ============================
 # GAME: TIC-TAC-TOE
@@ -2061,26 +3337,9 @@ class TicTacToeButton(Button):
         if winner:
             await interaction.response.defer()  # Prevent "interaction failed"
             view.stop()
-            stats = await get_user(winner.id)
-            if "stats" not in stats:
-                stats["stats"] = {}
-            if "tictactoe" not in stats["stats"]:
-                stats["stats"]["tictactoe"] = {"wins": 0, "losses": 0}
-            stats["stats"]["tictactoe"]["wins"] += 1
-
             loser = view.player2 if winner == view.player1 else view.player1
-            stats_loser = await get_user(loser.id)
-            if "stats" not in stats_loser:
-                stats_loser["stats"] = {}
-            if "tictactoe" not in stats_loser["stats"]:
-                stats_loser["stats"]["tictactoe"] = {"wins": 0, "losses": 0}
-            stats_loser["stats"]["tictactoe"]["losses"] += 1
-
-
-            stats["wallet"] += view.bet * 2
-
-            await update_user(winner.id, stats)
-            await update_user(loser.id, stats_loser)
+            await credit_wallet(winner.id, view.bet * 2, inc={"stats.tictactoe.wins": 1})
+            await increment_user(loser.id, "stats.tictactoe.losses", 1)
 
             await interaction.message.edit(
                 content=f"🎉 {winner.mention} wins! +{view.bet:,} 🥖", view=view)
@@ -2089,12 +3348,8 @@ class TicTacToeButton(Button):
             view.stop()
 
             # Refund both
-            p1_data = await get_user(view.player1.id)
-            p2_data = await get_user(view.player2.id)
-            p1_data["wallet"] += view.bet
-            p2_data["wallet"] += view.bet
-            await update_user(view.player1.id, p1_data)
-            await update_user(view.player2.id, p2_data)
+            await credit_wallet(view.player1.id, view.bet)
+            await credit_wallet(view.player2.id, view.bet)
 
             await interaction.message.edit(content="🤝 It's a draw! Bets refunded.", view=view)
         else:
@@ -2136,17 +3391,19 @@ class TicTacToeView(View):
 
 @bot.command(aliases=["tictactoe"])
 async def ttt(ctx, bet: int, member: discord.Member):
+    if bet <= 0:
+        return await ctx.send("❌ Bet must be greater than 0.")
     if member == ctx.author:
         return await ctx.send("❌ You can't play against yourself.")
     if member.bot:
         return await ctx.send("❌ You can't play against bots.")
 
-    p1_data = await get_user(ctx.author.id)
-    p2_data = await get_user(member.id)
+    p1_data = await get_user(ctx.author.id, ["wallet"]) or {}
+    p2_data = await get_user(member.id, ["wallet"]) or {}
 
-    if p1_data["wallet"] < bet:
+    if p1_data.get("wallet", 0) < bet:
         return await ctx.send("❌ You don't have enough 🥖 to place that bet.")
-    if p2_data["wallet"] < bet:
+    if p2_data.get("wallet", 0) < bet:
         return await ctx.send(f"❌ {member.display_name} doesn't have enough 🥖 to accept the challenge.")
 
     class ConfirmView(View):
@@ -2182,26 +3439,18 @@ async def ttt(ctx, bet: int, member: discord.Member):
     if view.value is False:
         return await msg.edit(content="❌ Challenge declined.", view=None)
 
-   
-    p1_data["wallet"] -= bet
-    p2_data["wallet"] -= bet
-    await update_user(ctx.author.id, p1_data)
-    await update_user(member.id, p2_data)
+    if not await debit_wallet(ctx.author.id, bet):
+        return await msg.edit(content="❌ You no longer have enough 🥖. Game cancelled.", view=None)
+    if not await debit_wallet(member.id, bet):
+        await credit_wallet(ctx.author.id, bet)
+        return await msg.edit(content=f"❌ {member.display_name} no longer has enough 🥖. Game cancelled.", view=None)
 
     game_view = TicTacToeView(ctx, ctx.author, member, bet)
     await msg.edit(content=f"Tic-Tac-Toe: {ctx.author.mention} vs {member.mention}\n{ctx.author.mention}'s turn", view=game_view)
     
 @bot.command()
 async def tttleaderboard(ctx):
-    users = await users_collection.find().to_list(length=100)
-    ranked = sorted(users, key=lambda u: u.get("stats", {}).get("tictactoe", {}).get("wins", 0), reverse=True)[:10]
-    embed = discord.Embed(title="🏆 Tic-Tac-Toe Leaderboard", color=discord.Color.blue())
-    for i, user in enumerate(ranked, 1):
-        member = await bot.fetch_user(int(user["_id"]))
-        wins = user.get("stats", {}).get("tictactoe", {}).get("wins", 0)
-        losses = user.get("stats", {}).get("tictactoe", {}).get("losses", 0)
-        embed.add_field(name=f"{i}. {member.name}", value=f"Wins: {wins}, Losses: {losses}", inline=False)
-    await ctx.send(embed=embed)
+    await ctx.send(embed=await leaderboards.get_embed("tictactoe"))
 
 
 # ============================
@@ -2244,23 +3493,10 @@ async def roast(ctx, member: discord.Member):
     await ctx.send(random.choice(roasts))
 
 @bot.command()
+@cooldown("hangman", 10800, "⏳ You must wait **{time}** before playing Hangman again.")
 async def hangman(ctx):
-    await get_user(ctx.author.id)
     user_id = str(ctx.author.id)
 
-    user = await users.find_one({"_id": user_id})
-    now = datetime.now()
-
-    if user and "cooldowns.hangman" in user:
-        cooldown_end = datetime.strptime(user["cooldowns.hangman"], "%Y-%m-%d %H:%M:%S")
-        if now < cooldown_end:
-            remaining = cooldown_end - now
-            hours, remainder = divmod(remaining.total_seconds(), 3600)
-            minutes, _ = divmod(remainder, 60)
-            return await ctx.send(
-                f"⏳ You must wait **{int(hours)}h {int(minutes)}m** before playing Hangman again."
-            )
-
     import string
     HANGMAN_WORDS = [  # (shortened for clarity, full list unchanged)
         "able", "acid", "aged", "ally", "area", "atom", "auto", "avid", "baby", "bake", "ball",
@@ -2333,26 +3569,11 @@ async def hangman(ctx):
         embed.description = f"```{stage}```\nWord: {' '.join(display)}\nLives left: {lives}"
         await message.edit(embed=embed, view=None)
 
-    cooldown_time = (now + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S")
     if "_" not in display:
-        await users.update_one(
-            {"_id": user_id},
-            {"$inc": {"wallet": 10000}, "$set": {"cooldowns.hangman": cooldown_time}},
-            upsert=True
-        )
+        await users.update_one({"_id": user_id}, {"$inc": {"wallet": 10000}}, upsert=True)
         await ctx.send(f"🎉 **You won!** The word was **{word}**\n💰 You earned **5000 🥖**!")
     else:
-        await users.update_one(
-            {"_id": user_id},
-            {"$set": {"cooldowns.hangman": cooldown_time}},
-            upsert=True
-        )
         await ctx.send(f"💀 **Game Over!** The word was **{word}**.")
-        
-        await users.update_one(
-    {"_id": str(ctx.author.id)},
-    {"$set": {"cooldowns.hangman": datetime.utcnow().isoformat()}}
-)
 
 
 
@@ -2499,11 +3720,12 @@ async def admin(ctx):
     embed.add_field(name="⚙️ Command Toggles", value="""
 `;disable <command>` — Disable a specific command  
 `;enable <command>` — Re-enable a disabled command  
+`;gatestats` — Show command check timings (p50/p99)  
 """, inline=False)
 
     await ctx.send(embed=embed)
 
-# === Global Lockdown + Mute Middleware ===
+# === Global Lockdown + Mute Controls ===
 
 @bot.command()
 async def muted(ctx):
@@ -2530,27 +3752,24 @@ async def muted(ctx):
     await ctx.send(embed=embed)
 
 
-@bot.check
-async def globally_block_commands(ctx):
-    # always allow these admin commands
-    if ctx.command and ctx.command.name in (
-        "raikomute", "raikoum",
-        "lockdown", "unlock",
-        "resetcd", "resetweekly"
-    ):
-        return True
+@bot.command()
+async def gatestats(ctx):
+    if ctx.author.id not in CREATOR_IDS:
+        return await ctx.send("🚫 Only the bot owner(s) can use this command.")
 
-    # check lockdown flag
-    settings = await bot_settings.find_one({"_id":"config"}) or {}
-    if settings.get("lockdown", False) and ctx.author.id not in CREATOR_IDS:
-        await ctx.send("Bot is currently in lockdown!")
-        return False
+    lines = []
+    for stage in CommandGate.STAGES:
+        count = len(command_gate.samples[stage])
+        p50 = command_gate.percentile(stage, 0.50) * 1000
+        p99 = command_gate.percentile(stage, 0.99) * 1000
+        lines.append(f"`{stage:<8}` p50 **{p50:.3f}ms** · p99 **{p99:.3f}ms** · n={count}")
 
-    # mute check
-    is_muted = await users.find_one({"_id": str(ctx.author.id), "muted": True})
-    if is_muted:
-        raise commands.CheckFailure("❌ You are muted and cannot use bot commands.")
-    return True
+    embed = discord.Embed(
+        title="⏱️ Command Gate Timings",
+        description="\n".join(lines),
+        color=discord.Color.blurple()
+    )
+    await ctx.send(embed=embed)
 
 
 # === Mute User ===
@@ -2562,11 +3781,7 @@ async def raikomute(ctx, member: discord.Member):
     if member.id in CREATOR_IDS:
         return await ctx.send("bro you tryna mute my creator? go fuck yourself haha")
 
-    await users.update_one(
-        {"_id": str(member.id)},
-        {"$set": {"muted": True}},
-        upsert=True
-    )
+    await settings_cache.set_muted(member.id, True)
     await ctx.send(f"🔇 {member.mention} has been muted from using bot commands.")
 
 # === Unmute User ===
@@ -2575,7 +3790,7 @@ async def raikoum(ctx, member: discord.Member):
     if ctx.author.id not in CREATOR_IDS:
         return await ctx.send("🚫 Only the bot owner(s) can use this command.")
 
-    await users.update_one({"_id": str(member.id)}, {"$unset": {"muted": ""}})
+    await settings_cache.set_muted(member.id, False)
     await ctx.send(f"🔊 {member.mention} can now use bot commands again.")
 
 
@@ -2585,8 +3800,8 @@ async def lockdown(ctx):
     if ctx.author.id not in CREATOR_IDS:
         return await ctx.send("🚫 Only the bot owner(s) can use this command.")
 
-    settings = await bot_settings.find_one({"_id": "config"})
-    if settings and settings.get("lockdown", False):
+    await settings_cache.ensure_loaded()
+    if settings_cache.lockdown:
         return await ctx.send("🚫 The bot is already in **lockdown** mode.")
 
     class ConfirmLockdown(View):
@@ -2594,7 +3809,7 @@ async def lockdown(ctx):
         async def confirm(self, interaction: discord.Interaction, button: Button):
             if interaction.user != ctx.author:
                 return await interaction.response.send_message("Only the command issuer can confirm.", ephemeral=True)
-            await bot_settings.update_one({"_id": "config"}, {"$set": {"lockdown": True}}, upsert=True)
+            await settings_cache.set_lockdown(True)
             await interaction.response.edit_message(content="🚫 Bot is now in **lockdown**. Only creators can use commands.", view=None)
 
         @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.secondary)
@@ -2612,8 +3827,8 @@ async def unlock(ctx):
     if ctx.author.id not in CREATOR_IDS:
         return await ctx.send("🚫 Only the bot owner(s) can use this command.")
 
-    settings = await bot_settings.find_one({"_id": "config"})
-    if settings and not settings.get("lockdown", False):
+    await settings_cache.ensure_loaded()
+    if not settings_cache.lockdown:
         return await ctx.send("🔓 The bot is already **unlocked**.")
 
     class ConfirmUnlock(View):
@@ -2621,7 +3836,7 @@ async def unlock(ctx):
         async def confirm(self, interaction: discord.Interaction, button: Button):
             if interaction.user != ctx.author:
                 return await interaction.response.send_message("Only the command issuer can confirm.", ephemeral=True)
-            await bot_settings.update_one({"_id": "config"}, {"$set": {"lockdown": False}}, upsert=True)
+            await settings_cache.set_lockdown(False)
             await interaction.response.edit_message(content="✅ Bot is now **unlocked**. Everyone can use commands again.", view=None)
 
         @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.secondary)
@@ -2662,16 +3877,19 @@ async def resetcd(ctx):
                 f"wordle.{today}:expert": "",
             }
 
-            # 1) Clear ALL cooldowns by replacing the object (no path conflict)
-            res1 = await users.update_many({}, {"$set": {"cooldowns": {}}})
+            # 1) Clear ALL cooldowns
+            await cooldown_store.clear_all()
 
-            # 2) Also remove today's Wordle flags wherever they might exist
-            res2 = await users.update_many({}, {"$unset": wordle_unset})
+            # 2) Also remove today's Wordle flags, only from users that have them
+            res2 = await users.update_many(
+                {"$or": [{path: {"$exists": True}} for path in wordle_unset]},
+                {"$unset": wordle_unset}
+            )
 
             await interaction.edit_original_response(
                 content=(
                     "♻️ Reset **all cooldowns** and cleared today's Wordle state.\n"
-                    f"• Cooldowns reset in **{res1.modified_count}** users\n"
+                    "• Every running cooldown has been cleared\n"
                     f"• Wordle keys cleared in **{res2.modified_count}** users"
                 ),
                 view=None
@@ -2700,10 +3918,8 @@ async def resetweekly(ctx):
         async def confirm(self, interaction: discord.Interaction, button: Button):
             if interaction.user != ctx.author:
                 return await interaction.response.send_message("Only the command issuer can confirm.", ephemeral=True)
-            count = users.update_many({}, {"$unset": {
-                "cooldowns.weekly": ""
-            }}).modified_count
-            await interaction.response.edit_message(content=f"🔁 Reset `;weekly` cooldown for {count} users.", view=None)
+            await cooldown_store.clear_all("weekly")
+            await interaction.response.edit_message(content="🔁 Reset `;weekly` cooldown for everyone.", view=None)
 
         @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.secondary)
         async def cancel(self, interaction: discord.Interaction, button: Button):
@@ -2763,15 +3979,11 @@ async def blackjack(ctx, bet: int):
 
     print(f"[DEBUG] Blackjack started by {ctx.author.display_name}, bet = {bet}")
 
-    user_data = await get_user(ctx.author.id)
     if bet <= 0:
         return await ctx.send("❌ Bet must be a positive number.")
-    if user_data["wallet"] < bet:
+    user_data = await debit_wallet(ctx.author.id, bet)
+    if not user_data:
         return await ctx.send("❌ You don't have enough 🥖 to place that bet.")
-
-    print(f"[DEBUG] {ctx.author.display_name} wallet before deduction: {user_data['wallet']}")
-    user_data["wallet"] -= bet
-    await users.update_one({"_id": str(ctx.author.id)}, {"$set": {"wallet": user_data["wallet"]}})
     print(f"[DEBUG] Deducted {bet} 🥖. New wallet: {user_data['wallet']}")
 
     values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
@@ -2827,15 +4039,6 @@ async def blackjack(ctx, bet: int):
             dealer_total = calc(dealer)
             print(f"[DEBUG] Final player: {player_total}, dealer: {dealer_total}")
             print(f"[DEBUG] Final player hand: {player}, dealer hand: {dealer}")
-            
-            if "stats" not in user_data:
-                user_data["stats"] = {}
-
-            if "blackjack" not in user_data["stats"]:
-                user_data["stats"]["blackjack"] = {"wins": 0, "losses": 0}
-                
-            stats = user_data["stats"]["blackjack"]
-
 
             content = (
                 f"🃏 Final hands:\n"
@@ -2844,24 +4047,18 @@ async def blackjack(ctx, bet: int):
             )
 
             if result == "win":
-                stats["wins"] += 1
-                user_data["wallet"] += bet * 2
-                CONTENT += f"\n🎉 You win! Gained 🥖 **{bet:,}**"
+                await credit_wallet(ctx.author.id, bet * 2, inc={"stats.blackjack.wins": 1})
+                content += f"\n🎉 You win! Gained 🥖 **{bet:,}**"
                 print("[DEBUG] Player wins. Bread added.")
             elif result == "lose":
-                stats["losses"] += 1
+                await increment_user(ctx.author.id, "stats.blackjack.losses", 1)
                 content += f"\n😢 You lose! Lost 🥖 **{bet:,}**"
                 print("[DEBUG] Player loses. No refund.")
             else:
-                user_data["wallet"] += bet
+                await credit_wallet(ctx.author.id, bet)
                 content += "\n🤝 It's a tie! Bet refunded."
                 print("[DEBUG] Tie. Bet refunded.")
 
-            await update_user(ctx.author.id, {
-                "wallet": user_data["wallet"],
-                "stats.blackjack": user_data["stats"]["blackjack"]
-            })
-
             print("[DEBUG] User data updated in DB.")
 
             for child in view.children:
@@ -2944,14 +4141,14 @@ async def rps(ctx, bet: int, opponent: discord.Member):
     if bet <= 0:
         return await ctx.send("❗ Usage: `;rps @user <bet>` — bet must be positive.")
 
-    author_data = await get_user(ctx.author.id)
-    opponent_data = await get_user(opponent.id)
-    print(f"[DEBUG] {ctx.author.display_name} wallet: {author_data['wallet']}")
-    print(f"[DEBUG] {opponent.display_name} wallet: {opponent_data['wallet']}")
+    author_data = await get_user(ctx.author.id, ["wallet"]) or {}
+    opponent_data = await get_user(opponent.id, ["wallet"]) or {}
+    print(f"[DEBUG] {ctx.author.display_name} wallet: {author_data.get('wallet', 0)}")
+    print(f"[DEBUG] {opponent.display_name} wallet: {opponent_data.get('wallet', 0)}")
 
-    if author_data["wallet"] < bet:
+    if author_data.get("wallet", 0) < bet:
         return await ctx.send("❌ You don’t have enough 🥖.")
-    if opponent_data["wallet"] < bet:
+    if opponent_data.get("wallet", 0) < bet:
         return await ctx.send(f"❌ {opponent.display_name} doesn’t have enough 🥖.")
 
     class ConfirmView(View):
@@ -2992,10 +4189,11 @@ async def rps(ctx, bet: int, opponent: discord.Member):
         return await confirm_msg.edit(content=f"❌ {opponent.mention} declined the match.", view=None)
 
     # Deduct bets up front
-    author_data["wallet"] -= bet
-    opponent_data["wallet"] -= bet
-    await users.update_one({"_id": str(ctx.author.id)}, {"$set": {"wallet": author_data["wallet"]}})
-    await users.update_one({"_id": str(opponent.id)}, {"$set": {"wallet": opponent_data["wallet"]}})
+    if not await debit_wallet(ctx.author.id, bet):
+        return await confirm_msg.edit(content="❌ You no longer have enough 🥖. Game canceled.", view=None)
+    if not await debit_wallet(opponent.id, bet):
+        await credit_wallet(ctx.author.id, bet)
+        return await confirm_msg.edit(content=f"❌ {opponent.display_name} no longer has enough 🥖. Game canceled.", view=None)
     print(f"[DEBUG] Deducted {bet} 🥖 from both players.")
 
     results = {}
@@ -3017,10 +4215,8 @@ async def rps(ctx, bet: int, opponent: discord.Member):
             }
 
             if c1 == c2:
-                author_data["wallet"] += bet
-                opponent_data["wallet"] += bet
-                await users.update_one({"_id": str(ctx.author.id)}, {"$set": {"wallet": author_data["wallet"]}})
-                await users.update_one({"_id": str(opponent.id)}, {"$set": {"wallet": opponent_data["wallet"]}})
+                await credit_wallet(ctx.author.id, bet)
+                await credit_wallet(opponent.id, bet)
                 await game_msg.edit(content=f"🤝 It’s a tie! Both chose {c1}", view=None)
                 print(f"[DEBUG] Tie — both refunded.")
             else:
@@ -3028,25 +4224,7 @@ async def rps(ctx, bet: int, opponent: discord.Member):
                 loser = opponent if winner == ctx.author else ctx.author
                 print(f"[DEBUG] Winner: {winner.display_name}, Loser: {loser.display_name}")
 
-                winner_data = await get_user(winner.id)
-                loser_data = await get_user(loser.id)
-
-                winner_data.setdefault("stats", {}).setdefault("rps", {}).setdefault("wins", 0)
-                loser_data.setdefault("stats", {}).setdefault("rps", {}).setdefault("losses", 0)
-
-                winner_data["stats"]["rps"]["wins"] += 1
-                loser_data["stats"]["rps"]["losses"] += 1
-
-                await users.update_one(
-                    {"_id": str(winner.id)},
-                    {
-                        "$inc": {
-                            "wallet": bet * 2,
-                            "stats.rps.wins": 1
-                        }
-                    },
-                    upsert=True
-                )
+                await credit_wallet(winner.id, bet * 2, inc={"stats.rps.wins": 1})
                 await users.update_one(
                     {"_id": str(loser.id)},
                     {
@@ -3099,8 +4277,86 @@ async def rps(ctx, bet: int, opponent: discord.Member):
 
 
 
-active_trivia = {}
-trivia_answers = {}
+
+TRIVIA_JOIN_SECONDS = 30
+TRIVIA_ANSWER_SECONDS = 30
+TRIVIA_COUNTDOWN_STEP = 10
+
+def _log_task_error(task):
+    if not task.cancelled() and task.exception():
+        print(f"[ERROR] Background task failed: {task.exception()!r}")
+
+def run_in_background(coro):
+    """Fire off a Discord call without waiting on it; failures are logged."""
+    task = asyncio.create_task(coro)
+    task.add_done_callback(_log_task_error)
+    return task
+
+async def countdown_until(deadline, update, step=TRIVIA_COUNTDOWN_STEP):
+    """Sleep until `deadline` (loop.time()), calling update(seconds_left) every `step` seconds.
+
+    Each tick is scheduled against the deadline itself and the updates run in
+    the background, so slow sends or edits never push the deadline back.
+    """
+    loop = asyncio.get_running_loop()
+    first = (math.ceil((deadline - loop.time()) / step) - 1) * step
+    for seconds_left in range(first, 0, -step):
+        await asyncio.sleep(max(0, deadline - seconds_left - loop.time()))
+        run_in_background(update(seconds_left))
+    await asyncio.sleep(max(0, deadline - loop.time()))
+
+# Games hand the messages they sent to message_cleanup, which deletes exactly
+# those, later, from one background worker: up to 100 at a time through the
+# bulk-delete endpoint, one by one only for messages too old for it. Going
+# through a single queue keeps deletes from bursting into the rate limits,
+# and the command that scheduled them doesn't wait on any of it.
+
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = timedelta(days=13, hours=23)  # Discord refuses bulk deletes past 14 days
+
+class MessageCleanup:
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def schedule(self, channel, messages, delay=0):
+        messages = [m for m in messages if m is not None]
+        if not messages:
+            return
+        due = asyncio.get_running_loop().time() + delay
+        self._queue.put_nowait((due, channel, messages))
+        if self._worker is None or self._worker.done():
+            self._worker = run_in_background(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._queue.empty():
+            due, channel, messages = await self._queue.get()
+            await asyncio.sleep(max(0, due - loop.time()))
+            try:
+                await self._delete(channel, messages)
+            except Exception as e:
+                print(f"[ERROR] Failed to clean up {len(messages)} messages: {e}")
+
+    async def _delete(self, channel, messages):
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [m for m in messages if m.created_at > cutoff]
+        singles = [m for m in messages if m.created_at <= cutoff]
+        for start in range(0, len(recent), BULK_DELETE_LIMIT):
+            chunk = recent[start:start + BULK_DELETE_LIMIT]
+            try:
+                await channel.delete_messages(chunk)
+            except discord.NotFound:
+                # Someone already deleted one of them and the whole chunk was
+                # refused, so delete the rest one by one
+                singles.extend(chunk)
+        for m in singles:
+            try:
+                await m.delete()
+            except discord.NotFound:
+                pass
+
+message_cleanup = MessageCleanup()
 
 # ────────────────────────────────────────────────────
 # COMMAND: STOP TRIVIA (Admin Only)
@@ -3109,13 +4365,9 @@ trivia_answers = {}
 @commands.has_permissions(administrator=True)
 async def stoptrivia(ctx):
     """Stops any active trivia in this channel."""
-    chan = ctx.channel.id
-    if chan not in active_trivia:
+    # The running game notices at the start of its next question and stops there
+    if not games.end("trivia", ctx.channel.id):
         return await ctx.send("⚠️ No active trivia to stop here.")
-
-    # Remove game state
-    del active_trivia[chan]
-    trivia_answers.pop(chan, None)
     await ctx.send("🛑 Trivia game has been stopped by an administrator.")
 
     
@@ -3130,32 +4382,11 @@ async def stopuno(ctx):
     Forcefully stops the UNO game in the current channel.
     """
     try:
-        for game in active_uno_games:
-            if game.ctx.channel.id == ctx.channel.id:
-                # Cancel turn timer if it's running
-                if hasattr(game, "timer_task") and game.timer_task:
-                    game.timer_task.cancel()
-
-                # Mark the game as ended
-                game.ended = True
-
-                # Disable interaction view if it's still visible
-                if game.message:
-                    if game.message.components:
-                        try:
-                            for item in game.message.components[0].children:
-                                item.disabled = True
-                            await game.message.edit(view=None)
-                        except:
-                            pass
-
-                # Remove game from active list
-                active_uno_games.remove(game)
-
-                await ctx.send("🛑 UNO game has been forcefully stopped.")
-                return
-
-        await ctx.send("❌ No active UNO game in this channel.")
+        # Ending it cancels the turn timers and clears the game's view
+        if games.end("uno", ctx.channel.id):
+            await ctx.send("🛑 UNO game has been forcefully stopped.")
+        else:
+            await ctx.send("❌ No active UNO game in this channel.")
 
     except Exception:
         print("[UNO ERROR] stopuno command failed.")
@@ -3169,197 +4400,179 @@ async def stopuno(ctx):
 # ────────────────────────────────────────────────────
 
 @bot.command()
+@cooldown("trivia", 86400, "⏳ Wait **{time}** before starting Trivia again.")
 async def trivia(ctx):
     if ctx.channel.id != 1399899594757767340:
+        await refund_cooldown(ctx)
         return await ctx.send("❌ Trivia can only be played in <#1399899594757767340>.")
 
-    global unused_trivia_questions
     messages_to_delete = []
 
-    # 1) Load local JSON questions
-    try:
-        with open("trivia_questions.json", "r") as f:
-            trivia_data = json.load(f)
-        if not trivia_data or not isinstance(trivia_data, list):
-            msg = await ctx.send("❗ `trivia_questions.json` must contain a non-empty array of questions.")
-            messages_to_delete.append(msg)
-            return
-    except FileNotFoundError:
-        msg = await ctx.send("❗ Couldn’t find `trivia_questions.json`.")
-        messages_to_delete.append(msg)
-        return
-    except json.JSONDecodeError as e:
-        msg = await ctx.send(f"❗ Error parsing `trivia_questions.json`: {e}")
+    # 1) Questions come from the in-memory bank; no disk I/O here
+    if not trivia_bank.questions:
+        await refund_cooldown(ctx)
+        msg = await ctx.send("❗ No trivia questions are loaded. Check `trivia_questions.json`.")
         messages_to_delete.append(msg)
         return
 
-    # 2) Cooldown check
-    user_id = str(ctx.author.id)
-    user = await users.find_one({"_id": user_id}) or {}
-    cds = user.get("cooldowns", {})
-    now = datetime.utcnow()
-    if "trivia" in cds:
-        try:
-            cd_time = datetime.fromisoformat(cds["trivia"])
-            if now < cd_time:
-                sec = int((cd_time - now).total_seconds())
-                h, m = sec // 3600, (sec % 3600) // 60
-                msg = await ctx.send(f"⏳ Wait **{h}h {m}m** before starting Trivia again.")
-                messages_to_delete.append(msg)
-                return
-        except:
-            pass
+    # 2) Cooldown is claimed by @cooldown before we get here
 
-    # 3) Prevent concurrent games
-    if ctx.channel.id in active_trivia:
-        msg = await ctx.send("⚠️ A trivia game is already running here.")
-        messages_to_delete.append(msg)
-        return
-
-    # 4) Join phase
+    # 3) Claim the channel for the whole game, join phase included
     players = {ctx.author.id: 0}
-    view = View(timeout=None)
-    class JoinButton(Button):
-        def __init__(self):
-            super().__init__(label="Join Trivia", style=discord.ButtonStyle.green)
-
-        async def callback(self, interaction):
-            uid = interaction.user.id
-            if uid not in players:
-                players[uid] = 0
-                await interaction.response.send_message("✅ Joined trivia!", ephemeral=True)
-            else:
-                await interaction.response.send_message("❗ Already joined.", ephemeral=True)
-    view.add_item(JoinButton())
-
-    msg = await ctx.send("🎮 Trivia starts in **30s**! Click to join.", view=view)
-    messages_to_delete.append(msg)
-    await asyncio.sleep(10); msg = await ctx.send("⏳ 20s left to join!"); messages_to_delete.append(msg)
-    await asyncio.sleep(10); msg = await ctx.send("⏳ 10s left to join!"); messages_to_delete.append(msg)
-    await asyncio.sleep(10)
-    msg = await ctx.send(f"✅ Starting with {len(players)} player(s)! Use `;a <A|B|C|D>`.")
-    messages_to_delete.append(msg)
-
-    # 5) Mark active & set cooldown
-    active_trivia[ctx.channel.id] = {
+    game = {
         "players": players,
         "answers": {},
         "host": ctx.author.id,
         "last_winners": []
     }
+    if not games.start("trivia", ctx.channel.id, game):
+        await refund_cooldown(ctx)
+        msg = await ctx.send("⚠️ A trivia game is already running here.")
+        messages_to_delete.append(msg)
+        return
 
-    # 6) Question loop
-    for q_num in range(1, 21):
-        active_trivia[ctx.channel.id]["answers"] = {}
-
-        if not unused_trivia_questions:
-            unused_trivia_questions = ALL_TRIVIA_QUESTIONS.copy()
-            random.shuffle(unused_trivia_questions)
-
-        qobj = unused_trivia_questions.pop()
-        question = html.unescape(qobj["question"])
-        correct  = html.unescape(qobj["answer"])
-
-        options = [html.unescape(opt) for opt in qobj.get("options", [])]
-        random.shuffle(options)
-
-        letters        = ["A", "B", "C", "D"]
-        mapping        = dict(zip(letters, options))
-        correct_letter = letters[options.index(correct)]
-
-        class AnswerSelect(Select):
-            def __init__(self, mapping):
-                opts = [
-                    SelectOption(label=text, value=letter)
-                    for letter, text in mapping.items()
-                ]
-                super().__init__(
-                    placeholder="Choose your answer…",
-                    min_values=1, max_values=1,
-                    options=opts
-                )
+    try:
+        # 4) Join phase
+        loop = asyncio.get_running_loop()
+        join_deadline = loop.time() + TRIVIA_JOIN_SECONDS
+        view = View(timeout=None)
+        class JoinButton(Button):
+            def __init__(self):
+                super().__init__(label="Join Trivia", style=discord.ButtonStyle.green)
 
             async def callback(self, interaction):
-                chan = interaction.channel.id
-                uid  = interaction.user.id
-                game = active_trivia.get(chan)
-                if not game or uid not in game["players"]:
-                    return await interaction.response.send_message("❌ You’re not in this trivia.", ephemeral=True)
-                if uid in game["answers"]:
-                    return await interaction.response.send_message("❗ You already answered.", ephemeral=True)
-                choice = self.values[0]
-                game["answers"][uid] = choice
-                await interaction.response.send_message(f"✅ You chose **{mapping[choice]}**", ephemeral=True)
-
-        view = View(timeout=30)
-        view.add_item(AnswerSelect(mapping))
-
-        opts_text = "\n".join(mapping[L] for L in letters)
-        embed = discord.Embed(
-            title=f"Question {q_num}/20",
-            description=question,
-            color=discord.Color.blue()
+                uid = interaction.user.id
+                if loop.time() >= join_deadline:
+                    await interaction.response.send_message("⌛ Joining has closed.", ephemeral=True)
+                elif uid not in players:
+                    players[uid] = 0
+                    await interaction.response.send_message("✅ Joined trivia!", ephemeral=True)
+                else:
+                    await interaction.response.send_message("❗ Already joined.", ephemeral=True)
+        view.add_item(JoinButton())
+
+        join_msg = await ctx.send(f"🎮 Trivia starts in **{TRIVIA_JOIN_SECONDS}s**! Click to join.", view=view)
+        messages_to_delete.append(join_msg)
+        await countdown_until(
+            join_deadline,
+            lambda left: join_msg.edit(content=f"🎮 Trivia starts in **{left}s**! Click to join.")
         )
-        embed.add_field(name="Choices", value=opts_text, inline=False)
-        msg = await ctx.send(embed=embed, view=view)
+        view.stop()
+        run_in_background(join_msg.edit(content="🎮 Joining has closed.", view=None))
+        msg = await ctx.send(f"✅ Starting with {len(players)} player(s)! Use `;a <A|B|C|D>`.")
         messages_to_delete.append(msg)
 
-        await asyncio.sleep(10); msg = await ctx.send("⏳ 20s left to answer!"); messages_to_delete.append(msg)
-        await asyncio.sleep(10); msg = await ctx.send("⏳ 10s left to answer!"); messages_to_delete.append(msg)
-        await asyncio.sleep(10)
+        # 5) Question loop
+        for q_num in range(1, 21):
+            if games.get("trivia", ctx.channel.id) is not game:
+                break  # stopped by an admin
+            game["answers"] = {}
+
+            qobj = await draw_trivia_question(ctx.channel.id)
+            if qobj is None:
+                break  # the bank was emptied mid-game
+            question = qobj.question
+            correct  = qobj.answer
+
+            options = list(qobj.options)
+            random.shuffle(options)
+
+            letters        = ["A", "B", "C", "D"]
+            mapping        = dict(zip(letters, options))
+            correct_letter = letters[options.index(correct)]
+
+            class AnswerSelect(Select):
+                def __init__(self, mapping, deadline):
+                    self.deadline = deadline
+                    opts = [
+                        SelectOption(label=text, value=letter)
+                        for letter, text in mapping.items()
+                    ]
+                    super().__init__(
+                        placeholder="Choose your answer…",
+                        min_values=1, max_values=1,
+                        options=opts
+                    )
 
-        winners = []
-        for uid in players:
-            ans = active_trivia[ctx.channel.id]["answers"].get(uid, "")
-            if ans == correct_letter:
-                players[uid] += 1
-                await users.update_one(
-                    {"_id": str(uid)},
-                    {"$inc": {"wallet": qobj.get("points", 1000)}},
-                    upsert=True
-                )
-                winners.append(f"<@{uid}> (+{qobj.get('points', 1000)} 🥖)")
+                async def callback(self, interaction):
+                    chan = interaction.channel.id
+                    uid  = interaction.user.id
+                    game = games.get("trivia", chan)
+                    if loop.time() >= self.deadline:
+                        return await interaction.response.send_message("⌛ Time's up for this question.", ephemeral=True)
+                    if not game or uid not in game["players"]:
+                        return await interaction.response.send_message("❌ You’re not in this trivia.", ephemeral=True)
+                    if uid in game["answers"]:
+                        return await interaction.response.send_message("❗ You already answered.", ephemeral=True)
+                    choice = self.values[0]
+                    game["answers"][uid] = choice
+                    await interaction.response.send_message(f"✅ You chose **{mapping[choice]}**", ephemeral=True)
+
+            # Open-ended until the question is posted; the real deadline is set below
+            answer_select = AnswerSelect(mapping, math.inf)
+            view = View(timeout=None)
+            view.add_item(answer_select)
+
+            opts_text = "\n".join(mapping[L] for L in letters)
+            embed = discord.Embed(
+                title=f"Question {q_num}/20",
+                description=question,
+                color=discord.Color.blue()
+            )
+            embed.add_field(name="Choices", value=opts_text, inline=False)
+            embed.set_footer(text=f"⏳ {TRIVIA_ANSWER_SECONDS}s left to answer!")
+            question_msg = await ctx.send(embed=embed, view=view)
+            messages_to_delete.append(question_msg)
 
-        active_trivia[ctx.channel.id]["last_winners"] = winners
-        win_text = ", ".join(winners) if winners else "No one"
-        msg = await ctx.send(f"✅ Correct: **{correct_letter}** — Winners: {win_text}")
-        messages_to_delete.append(msg)
+            # The answer window is measured from the moment the question is up, on
+            # the loop's monotonic clock, so send latency doesn't eat into it
+            deadline = loop.time() + TRIVIA_ANSWER_SECONDS
+            answer_select.deadline = deadline
 
-    final = sorted(players.items(), key=lambda x: x[1], reverse=True)
-    board = "\n".join(f"{i+1}. <@{uid}> — **{pts}**" for i, (uid, pts) in enumerate(final))
-    msg = await ctx.send("🏁 **Trivia Over!**\n" + board)
-    messages_to_delete.append(msg)
-
-    if len(players) >= 3:
-        prizes = [10000, 6000, 3000]
-        podium = []
-        for i in range(min(3, len(final))):
-            uid, _ = final[i]
-            await users.update_one(
-                {"_id": str(uid)},
-                {"$inc": {"wallet": prizes[i]}}, upsert=True
-            )
-            podium.append(f"{['🥇','🥈','🥉'][i]} +{prizes[i]} 🥖")
-        msg = await ctx.send("🏆 Podium Prizes:\n" + "\n".join(podium))
-        messages_to_delete.append(msg)
+            def show_time_left(left, embed=embed, message=question_msg):
+                embed.set_footer(text=f"⏳ {left}s left to answer!")
+                return message.edit(embed=embed)
 
-        del active_trivia[ctx.channel.id]
-    trivia_answers.pop(ctx.channel.id, None)
+            await countdown_until(deadline, show_time_left)
+            view.stop()
+            embed.set_footer(text="⌛ Time's up!")
+            run_in_background(question_msg.edit(embed=embed, view=None))
 
-    await users.update_one(
-        {"_id": user_id},
-        {"$set": {"cooldowns.trivia": now.isoformat()}},
-        upsert=True
-    )
+            # Score the whole round in memory, then queue every payout as one batch
+            answers = game["answers"]
+            round_credits = {uid: qobj.points for uid in players if answers.get(uid) == correct_letter}
+            for uid in round_credits:
+                players[uid] += 1
+            queue_wallet_credits(round_credits, mirror=("stats.trivia.points",))
+            winners = [f"<@{uid}> (+{qobj.points} 🥖)" for uid in round_credits]
 
-    await asyncio.sleep(5)
-    try:
-        def not_pinned(m):
-            return not m.pinned
+            game["last_winners"] = winners
+            win_text = ", ".join(winners) if winners else "No one"
+            msg = await ctx.send(f"✅ Correct: **{correct_letter}** — Winners: {win_text}")
+            messages_to_delete.append(msg)
 
-        await ctx.channel.purge(limit=1000, check=not_pinned)
-    except Exception as e:
-        print(f"[ERROR] Failed to purge messages: {e}")
+        # A game an admin stopped has already been ended; it gets no board or prizes
+        if games.end("trivia", ctx.channel.id, game) is not None:
+            final = sorted(players.items(), key=lambda x: x[1], reverse=True)
+            board = "\n".join(f"{i+1}. <@{uid}> — **{pts}**" for i, (uid, pts) in enumerate(final))
+            msg = await ctx.send("🏁 **Trivia Over!**\n" + board)
+            messages_to_delete.append(msg)
+
+            if len(players) >= 3:
+                prizes = [10000, 6000, 3000]
+                podium_credits = {uid: prizes[i] for i, (uid, _) in enumerate(final[:3])}
+                queue_wallet_credits(podium_credits)
+                # Land the final round and the podium together before announcing them
+                await wallet_writer.flush()
+                podium = [f"{['🥇','🥈','🥉'][i]} +{prize} 🥖" for i, prize in enumerate(podium_credits.values())]
+                msg = await ctx.send("🏆 Podium Prizes:\n" + "\n".join(podium))
+                messages_to_delete.append(msg)
+    finally:
+        # Free the channel however the game ended, so an error mid-game can't leave it stuck
+        games.end("trivia", ctx.channel.id, game)
+
+        # Only the messages this game sent (plus the command that started it) are removed
+        message_cleanup.schedule(ctx.channel, [ctx.message] + messages_to_delete, delay=5)
 
 
 
@@ -3368,24 +4581,9 @@ async def pay(ctx, member: discord.Member, amount: int):
     if member.bot or member == ctx.author:
         return await ctx.send("❌ Invalid recipient.")
 
-    sender_data = await get_user(ctx.author.id)
-    receiver_data = await get_user(member.id)
-
-    if sender_data["wallet"] < amount or amount <= 0:
+    if amount <= 0 or not await transfer_wallet(ctx.author.id, member.id, amount):
         return await ctx.send("❌ Not enough 🥖 or invalid amount.")
 
-    sender_new_wallet = sender_data["wallet"] - amount
-    receiver_new_wallet = receiver_data["wallet"] + amount
-
-    await users.update_one(
-        {"_id": str(ctx.author.id)},
-        {"$set": {"wallet": sender_new_wallet}}
-    )
-    await users.update_one(
-        {"_id": str(member.id)},
-        {"$set": {"wallet": receiver_new_wallet}}
-    )
-
     await ctx.send(f"✅ {ctx.author.mention} paid {member.mention} 🥖 {amount}.")
     
 
@@ -3419,18 +4617,7 @@ async def gen(ctx, amount: int, member: discord.Member = None):
 
 @bot.command()
 async def top(ctx):
-    top_users = users.find().sort("wallet", -1).limit(20)
-    leaderboard = []
-    rank = 1
-    async for user_data in top_users:
-        member = ctx.guild.get_member(int(user_data["_id"]))
-        name = member.display_name if member else f"<@{user_data['_id']}>"
-        balance = user_data.get("wallet", 0)
-        leaderboard.append(f"**{rank}.** {name} - 🥖 {balance:,}")
-        rank += 1
-
-    embed = discord.Embed(title="🏆 Top 20 Richest Users", description="\n".join(leaderboard), color=0xFFD700)
-    await ctx.send(embed=embed)
+    await ctx.send(embed=await leaderboards.get_embed("wallet"))
 
 
 # ============================
@@ -3454,14 +4641,8 @@ async def beg(ctx, target: discord.Member):
                 return await interaction.response.send_message("Not your button.", ephemeral=True)
             accepted.append(True)
             await interaction.response.send_message("🥖 Take my bread...", ephemeral=True)
-            giver = await get_user(target.id)
-            receiver = await get_user(ctx.author.id)
             amount = random.randint(1000, 5000)
-            if giver["wallet"] >= amount:
-                giver["wallet"] -= amount
-                receiver["wallet"] += amount
-                await update_user(target.id, giver)
-                await update_user(ctx.author.id, receiver)
+            if await transfer_wallet(target.id, ctx.author.id, amount):
                 await ctx.send(f"{ctx.author.mention} begged and received 🥖 {amount} from {target.mention}")
             else:
                 await ctx.send(f"{target.mention} is too broke to give you bread.")
@@ -3488,7 +4669,7 @@ async def beg(ctx, target: discord.Member):
 @bot.command(aliases=["bal", "cash", "bread"])
 async def balance(ctx, member: discord.Member = None):
     user = member or ctx.author
-    user_data = await get_user(user.id)
+    user_data = await get_user(user.id, ["wallet", "bank"]) or {}
 
     wallet = user_data.get("wallet", 0)
     bank = user_data.get("bank", 0)
@@ -3592,12 +4773,10 @@ class Connect4View(View):
                 loser = self.p2 if winner_user == self.p1 else self.p1
                 print(f"[DEBUG] Winner: {winner_user.display_name}, Loser: {loser.display_name}")
 
-                await increment_user(winner_user.id, "stats.connect4.wins", 1)
-                print("[DEBUG] Updated winner stats")
+                await credit_wallet(winner_user.id, self.bet * 2, inc={"stats.connect4.wins": 1})
+                print("[DEBUG] Bread and win given to winner")
                 await increment_user(loser.id, "stats.connect4.losses", 1)
                 print("[DEBUG] Updated loser stats")
-                await increment_user(winner_user.id, "wallet", self.bet * 2)
-                print("[DEBUG] Bread given to winner")
 
                 await self.message.edit(
                     content=f"🏆 {winner_user.mention} wins Connect 4! +{self.bet * 2:,} 🥖",
@@ -3617,8 +4796,8 @@ class Connect4View(View):
         if self.is_full():
             print("[DEBUG] Board is full. It's a tie.")
             await interaction.response.defer()
-            await increment_user(self.p1.id, "wallet", self.bet)
-            await increment_user(self.p2.id, "wallet", self.bet)
+            await credit_wallet(self.p1.id, self.bet)
+            await credit_wallet(self.p2.id, self.bet)
             await self.message.edit(content="🤝 It's a tie! Bets refunded.", view=None)
             self.stop()
             return
@@ -3660,12 +4839,12 @@ async def connect4(ctx, bet: int, opponent: discord.Member):
     if opponent == ctx.author:
         return await ctx.send("❌ You can't play against yourself.")
 
-    p1_data = await get_user(ctx.author.id)
-    p2_data = await get_user(opponent.id)
+    p1_data = await get_user(ctx.author.id, ["wallet"]) or {}
+    p2_data = await get_user(opponent.id, ["wallet"]) or {}
 
-    if p1_data["wallet"] < bet:
+    if p1_data.get("wallet", 0) < bet:
         return await ctx.send("❌ You don't have enough 🥖 to place that bet.")
-    if p2_data["wallet"] < bet:
+    if p2_data.get("wallet", 0) < bet:
         return await ctx.send(f"❌ {opponent.display_name} doesn't have enough 🥖 to accept the challenge.")
 
     class ConfirmConnect4(View):
@@ -3702,8 +4881,11 @@ async def connect4(ctx, bet: int, opponent: discord.Member):
     if not view.accepted:
         return
 
-    await increment_user(ctx.author.id, "wallet", -bet)
-    await increment_user(opponent.id, "wallet", -bet)
+    if not await debit_wallet(ctx.author.id, bet):
+        return await ctx.send("❌ You no longer have enough 🥖. Game cancelled.")
+    if not await debit_wallet(opponent.id, bet):
+        await credit_wallet(ctx.author.id, bet)
+        return await ctx.send(f"❌ {opponent.display_name} no longer has enough 🥖. Game cancelled.")
 
     game_view = Connect4View(ctx, ctx.author, opponent, bet)
     content = f"Connect 4: {ctx.author.mention} (🔴) vs {opponent.mention} (🟡)\n{ctx.author.mention}'s turn (🔴)"
@@ -3735,7 +4917,6 @@ async def test(interaction: discord.Interaction):
 # ======== LOOT CHEST =========
 # =============================
 
-active_chests = {}  # Global chest tracker
 
 CHEST_TYPES = [
     {
@@ -3785,12 +4966,25 @@ def choose_chest():
     return random.choices(CHEST_TYPES, weights=weights, k=1)[0]
 
 
+def spawn_chest(channel, chest_type):
+    """Register a chest in the channel and let it vanish after 30s if nobody picks it."""
+    chest = {**chest_type, "claimed": False}
+    if not games.start("chest", channel.id, chest):
+        return None
+
+    async def timeout_cleanup():
+        await asyncio.sleep(30)
+        if not chest["claimed"] and games.end("chest", channel.id, chest):
+            await channel.send("⏳ The chest vanished. Nobody claimed it in time.")
+
+    games.track("chest", channel.id, asyncio.create_task(timeout_cleanup()))
+    return chest
+
+
 @bot.command(name="forcechest")
 @commands.has_permissions(administrator=True)
 async def forcechest(ctx):
-    global active_chests
-
-    if ctx.channel.id in active_chests:
+    if games.running("chest", ctx.channel.id):
         return await ctx.send("⚠️ A chest is already active in this channel.")
 
     chest = choose_chest()
@@ -3803,18 +4997,7 @@ async def forcechest(ctx):
     embed.set_image(url=chest["image"])
     await ctx.send(embed=embed)
 
-    active_chests[ctx.channel.id] = {
-        **chest,
-        "claimed": False
-    }
-
-    async def timeout_cleanup():
-        await asyncio.sleep(30)
-        if ctx.channel.id in active_chests and not active_chests[ctx.channel.id]["claimed"]:
-            await ctx.send("⏳ The chest vanished. Nobody claimed it in time.")
-            del active_chests[ctx.channel.id]
-
-    asyncio.create_task(timeout_cleanup())
+    spawn_chest(ctx.channel, chest)
 
 
 # ============================
@@ -3833,30 +5016,19 @@ async def on_message(message):
     # UNO "call uno" detection
     # ========================
     if content == "uno":
-        for game in active_uno_games:
-            if game.message and game.message.channel.id == message.channel.id:
-                if message.author in game.players:
-                    hand_size = len(game.hands.get(message.author, []))
-                    if hand_size == 1:
-                        if game.called_uno.get(message.author) is None:
-                            game.called_uno[message.author] = True
-                            await message.channel.send(f"📢 **{message.author.display_name}** called **UNO!!**")
-                    elif hand_size > 1:
-                        game.hands[message.author].append(game.deck.pop())
-                        await message.channel.send(f"❌ **{message.author.display_name}** falsely called UNO and drew 1 penalty card.")
-                        game.advance_turn()
-                        await start_uno_game(bot, game)
-                    return
+        game = games.get("uno", message.channel.id)
+        if game and message.author in game.players:
+            await call_uno(bot, game, message.author)
+            return
 
     # ========================
     # Loot Chest System
     # ========================
-    global active_chests
     channel = message.channel
 
     if content == "!pick":
-        if channel.id in active_chests:
-            chest = active_chests[channel.id]
+        chest = games.get("chest", channel.id)
+        if chest:
             if chest["claimed"]:
                 if message.author.id == chest.get("claimed_by"):
                     return  # don't roast the winner again
@@ -3875,11 +5047,7 @@ async def on_message(message):
                     amount = random.randint(chest["min"], chest["max"])
 
 
-                await users.update_one(
-                    {"_id": str(claimer.id)},
-                    {"$inc": {"wallet": amount}},
-                    upsert=True
-                )
+                queue_wallet_credit(claimer.id, amount)
 
                 if chest["cursed"]:
                     await channel.send(
@@ -3893,17 +5061,16 @@ async def on_message(message):
 
                 async def delayed_delete():
                     await asyncio.sleep(10)
-                    if channel.id in active_chests:
-                        del active_chests[channel.id]
+                    games.end("chest", channel.id, chest)
 
-                asyncio.create_task(delayed_delete())
+                games.track("chest", channel.id, asyncio.create_task(delayed_delete()))
 
         await bot.process_commands(message)
         return
 
 
     # 1% spawn chance
-    if channel.id not in active_chests and random.randint(1, 100) == 1:
+    if not games.running("chest", channel.id) and random.randint(1, 100) == 1:
         chest = choose_chest()
 
         embed = discord.Embed(
@@ -3914,18 +5081,7 @@ async def on_message(message):
         embed.set_image(url=chest["image"])
         await channel.send(embed=embed)
 
-        active_chests[channel.id] = {
-            **chest,
-            "claimed": False
-        }
-
-        async def timeout_cleanup():
-            await asyncio.sleep(30)
-            if channel.id in active_chests and not active_chests[channel.id]["claimed"]:
-                await channel.send("⏳ The chest vanished. Nobody claimed it in time.")
-                del active_chests[channel.id]
-
-        asyncio.create_task(timeout_cleanup())
+        spawn_chest(channel, chest)
 
     await bot.process_commands(message)
 
@@ -3955,10 +5111,11 @@ async def change_status():
 # Startup confirmation
 @bot.event
 async def on_ready():
-    global lottery_started
-    if not lottery_started:
-        lottery_check.start()
-        lottery_started = True
+    job_scheduler.start()
+    if not refresh_settings.is_running():
+        refresh_settings.start()
+    if not refresh_trivia_bank.is_running():
+        refresh_trivia_bank.start()
     change_status.start()
     await bot.change_presence(status=discord.Status.online)
     print(f"🤖 Logged in as {bot.user} (ID: {bot.user.id})")
@@ -3986,6 +5143,18 @@ async def main():
     print("🔧 Inside async main()")
     await run_webserver()
     await test_mongodb()
+    await ensure_indexes()
+    await backfill_net_worth()
+    try:
+        await settings_cache.ensure_loaded()
+        await cooldown_store.load_generations()
+    except Exception as e:
+        print(f"❌ Failed to load bot settings: {e}")
+    await migrate_legacy_cooldowns()
+    try:
+        await lottery_ledger.sync()
+    except Exception as e:
+        print(f"❌ Lottery ledger sync failed: {e}")
     token = os.getenv("DISCORD_BOT_TOKEN")
     if not token:
         print("❌ DISCORD_BOT_TOKEN is missing or empty!")
@@ -3997,6 +5166,8 @@ async def main():
         print("🔁 Bot loop should never reach here unless it disconnects.")
     except Exception as e:
         print(f"❌ Exception in bot.start(): {e}")
+    finally:
+        await wallet_writer.close()
         
 if __name__ == "__main__":
     import asyncio
@@ -6,6 +6,8 @@ import random
 from PIL import Image, ImageDraw, ImageFont
 import io
 
+from game_registry import games
+
 MONOPOLY_STARTING_MONEY = 1500000
 EMOJI_TOKENS = ['🐶', '👠', '🎩', '🚗']
 HOUSE = '🏠'
@@ -265,17 +267,15 @@ class BuyButton(discord.ui.Button):
         await self.game.advance_turn(interaction)
 
 
-monopoly_games = {1400971551351898216}
-
 def register_monopoly_commands(bot):
 
     @bot.command(name="mjoin")
     async def mjoin(ctx):
-        game = monopoly_games.get(ctx.channel.id)
+        game = games.get("monopoly", ctx.channel.id)
 
         if game is None:
             game = MonopolyGame(ctx)
-            monopoly_games[ctx.channel.id] = game
+            games.start("monopoly", ctx.channel.id, game)
 
         if game.started:
             return await ctx.send("🎲 The game has already started.")
@@ -294,7 +294,7 @@ def register_monopoly_commands(bot):
 
     @bot.command(name="mstart")
     async def mstart(ctx):
-        game = monopoly_games.get(ctx.channel.id)
+        game = games.get("monopoly", ctx.channel.id)
         if not game:
             return await ctx.send("❗ No players have joined yet.")
 
@@ -310,7 +310,7 @@ def register_monopoly_commands(bot):
 
     @bot.command(name="mbal", aliases=["mbalance"])
     async def mbal(ctx):
-        game = monopoly_games.get(ctx.channel.id)
+        game = games.get("monopoly", ctx.channel.id)
         if not game:
             return await ctx.send("❗ No Monopoly game running in this channel.")
 
@@ -322,7 +322,7 @@ def register_monopoly_commands(bot):
 
     @bot.command(name="mstatus")
     async def mstatus(ctx):
-        game = monopoly_games.get(ctx.channel.id)
+        game = games.get("monopoly", ctx.channel.id)
         if not game:
             return await ctx.send("❗ No Monopoly game running.")
 
@@ -335,7 +335,7 @@ def register_monopoly_commands(bot):
 
     @bot.command(name="mreset")
     async def mreset(ctx):
-        monopoly_games.pop(ctx.channel.id, None)
+        games.end("monopoly", ctx.channel.id)
         await ctx.send("🔁 Monopoly game reset in this channel.")
 
 # === Views and Buttons ===
@@ -382,17 +382,12 @@ class BuyPropertyView(discord.ui.View):
         await interaction.response.send_message("⏭️ You skipped the property.", ephemeral=True)
         await self.game.next_turn()
 
-# === Global State ===
-active_monopoly_games = {}
-
 # === Command to start a Monopoly game ===
 @bot.command(name="mstart")
 async def monopoly_start(ctx):
-    if ctx.channel.id in active_monopoly_games:
+    if games.running("monopoly", ctx.channel.id):
         return await ctx.send("⚠️ A Monopoly game is already ongoing!")
 
-monopoly_games = {}
-
 class JoinMonopolyView(View):
     def __init__(self, ctx, host):
         super().__init__(timeout=30)
@@ -423,12 +418,12 @@ class JoinMonopolyView(View):
             players.append(MonopolyPlayer(user, token))
 
         game = MonopolyGame(self.ctx, players)
-        monopoly_games[self.ctx.channel.id] = game
+        games.start("monopoly", self.ctx.channel.id, game)
         await game.start_turn()
 
 @bot.command(name="mstart")
 async def mstart(ctx):
-    if ctx.channel.id in monopoly_games:
+    if games.running("monopoly", ctx.channel.id):
         return await ctx.send("⚠️ A Monopoly game is already running in this channel.")
 
     view = JoinMonopolyView(ctx, ctx.author)
@@ -436,34 +431,34 @@ async def mstart(ctx):
 
 @bot.command(name="mroll")
 async def mroll(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No game running in this channel.")
     await game.roll_dice(ctx.author)
 
 @bot.command(name="mskip")
 async def mskip(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No game running in this channel.")
     await game.skip_turn(ctx.author)
 
 @bot.command(name="mbuy")
 async def mbuy(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No game running in this channel.")
     await game.buy_property(ctx.author)
 
 @bot.command(name="mbal")
 async def mbal(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No game running in this channel.")
     await game.show_balance(ctx.author)
 @bot.command(name="mupgrade")
 async def mupgrade(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No Monopoly game running here.")
     player = game.get_player(ctx.author)
@@ -506,7 +501,7 @@ async def mupgrade(ctx):
 
 @bot.command(name="mprops")
 async def mprops(ctx):
-    game = monopoly_games.get(ctx.channel.id)
+    game = games.get("monopoly", ctx.channel.id)
     if not game:
         return await ctx.send("❗ No Monopoly game running.")
     player = game.get_player(ctx.author)
@@ -554,5 +549,5 @@ def check_elimination(game):
     if len(remaining) == 1:
         winner = remaining[0]
         game.ctx.send(f"🏆 {winner.user.mention} wins Monopoly with ${winner.money:,}!")
-        del monopoly_games[game.ctx.channel.id]
+        games.end("monopoly", game.ctx.channel.id, game)
 
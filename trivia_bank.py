@@ -0,0 +1,193 @@
+import hashlib
+import html
+import itertools
+import json
+import os
+import random
+from collections import deque
+
+# Parsed, unescaped and indexed copy of trivia_questions.json. Nothing here
+# touches Discord; main.py asks the bank for questions and calls refresh()
+# from a background loop so edits to the file are picked up without a restart.
+
+DEFAULT_POINTS = 1000
+
+
+class Question:
+    __slots__ = ("id", "question", "answer", "options", "category", "points")
+
+    def __init__(self, qid, question, answer, options, category, points):
+        self.id = qid
+        self.question = question
+        self.answer = answer
+        self.options = options
+        self.category = category
+        self.points = points
+
+
+def parse_question(index, raw):
+    """Build a Question from one JSON entry, or raise ValueError saying what's wrong with it."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"question {index} is not an object")
+    try:
+        question = html.unescape(raw["question"])
+        answer = html.unescape(raw["answer"])
+        options = tuple(html.unescape(opt) for opt in raw["options"])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"question {index} is missing {e}")
+    if answer not in options:
+        raise ValueError(f"question {index}: the answer is not one of its options")
+    # Keyed by the question text rather than its position, so ids stay put when the file is edited
+    key = hashlib.sha1(question.encode("utf-8")).hexdigest()[:12]
+    return Question(key, question, answer, options, raw.get("category", "General"), raw.get("points", DEFAULT_POINTS))
+
+
+class QuestionBank:
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.questions = []
+        self.by_category = {}  # category -> [Question]
+        self.by_points = {}    # points -> [Question]
+
+    def load(self):
+        """Read and index the file. On any error the previous questions are kept and ValueError is raised."""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"couldn't find {self.path}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"error parsing {self.path}: {e}")
+        if not raw or not isinstance(raw, list):
+            raise ValueError(f"{self.path} must contain a non-empty array of questions")
+
+        # The file repeats some question texts; those would share an id, so keep the first of each
+        questions, ids = [], set()
+        for i, entry in enumerate(raw):
+            q = parse_question(i, entry)
+            if q.id not in ids:
+                ids.add(q.id)
+                questions.append(q)
+        by_category, by_points = {}, {}
+        for q in questions:
+            by_category.setdefault(q.category, []).append(q)
+            by_points.setdefault(q.points, []).append(q)
+
+        self.questions, self.by_category, self.by_points = questions, by_category, by_points
+        self.mtime = mtime
+        return len(questions)
+
+    def refresh(self):
+        """Reload if the file changed since the last load. Returns True when it reloaded."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        self.load()
+        return True
+
+
+# Questions a channel has seen recently are held back until this fraction of
+# the bank has been asked there since.
+NO_REPEAT_FRACTION = 0.75
+MAX_DRAW_ATTEMPTS = 8
+
+
+class QuestionSampler:
+    """Draws questions per channel, weighted by category and points, without repeats.
+
+    Questions are grouped into (category, points) buckets. A bucket is picked
+    with weight size * category weight * points weight (so with no weights
+    every question is equally likely), then a question is picked from it at
+    random and retried if the channel saw it within its no-repeat window.
+    Each channel's window is a deque plus a set, so checks are O(1); the
+    window holds question ids so it survives reloads and can be persisted.
+    """
+
+    def __init__(self, bank, category_weights=None, points_weights=None, rng=None):
+        self.bank = bank
+        self.category_weights = category_weights or {}
+        self.points_weights = points_weights or {}
+        self.rng = rng or random.Random()
+        self._source = None
+        self._buckets = []
+        self._cum_weights = []
+        self._live = 0  # buckets with a non-zero weight
+        self._window = 0
+        self._recent = {}  # channel -> (deque of ids, set of ids)
+
+    def _rebuild(self):
+        buckets = {}
+        for q in self.bank.questions:
+            buckets.setdefault((q.category, q.points), []).append(q)
+        self._buckets = list(buckets.values())
+        weights = [
+            len(qs) * self.category_weights.get(qs[0].category, 1) * self.points_weights.get(qs[0].points, 1)
+            for qs in self._buckets
+        ]
+        # Cumulative weights let choices() bisect instead of summing every bucket per draw
+        self._cum_weights = list(itertools.accumulate(weights))
+        self._live = sum(1 for w in weights if w > 0)
+        # load() dedupes ids, so the question count is the distinct-id count
+        self._window = int(len(self.bank.questions) * NO_REPEAT_FRACTION)
+        self._source = self.bank.questions
+
+    def window(self):
+        if self._source is not self.bank.questions:
+            self._rebuild()
+        return self._window
+
+    def has(self, channel):
+        return channel in self._recent
+
+    def restore(self, channel, ids):
+        window = self.window()
+        recent = deque(ids[-window:] if window else [])
+        self._recent[channel] = (recent, set(recent))
+
+    def recent(self, channel):
+        return list(self._recent.get(channel, ((), None))[0])
+
+    def draw(self, channel):
+        if self._source is not self.bank.questions:
+            self._rebuild()
+        if not self._live:
+            return None
+        if channel not in self._recent:
+            self.restore(channel, [])
+        recent, seen = self._recent[channel]
+
+        question = None
+        exhausted = set()  # buckets this draw found fully inside the window
+        while question is None:
+            if len(exhausted) >= self._live:
+                # Every bucket is exhausted by the window: let the oldest question back in
+                if not recent:
+                    return None
+                seen.discard(recent.popleft())
+                exhausted.clear()
+            bucket = self.rng.choices(range(len(self._buckets)), cum_weights=self._cum_weights)[0]
+            if bucket in exhausted:
+                continue
+            candidates = self._buckets[bucket]
+            for _ in range(MAX_DRAW_ATTEMPTS):
+                pick = self.rng.choice(candidates)
+                if pick.id not in seen:
+                    question = pick
+                    break
+            else:
+                unseen = [q for q in candidates if q.id not in seen]
+                if unseen:
+                    question = self.rng.choice(unseen)
+                else:
+                    exhausted.add(bucket)
+
+        recent.append(question.id)
+        seen.add(question.id)
+        while len(recent) > self._window:
+            seen.discard(recent.popleft())
+        return question
@@ -0,0 +1,90 @@
+import random
+
+# UNO cards as small ints. The low four bits are the value and the bits above
+# them the color, so a card is (color << 4) | value. Wilds in hand carry the
+# WILD color; once played, the top of the pile is recolored to the chosen
+# color. Everything about a card is read from tables built once at import,
+# and emoji strings only appear when something is rendered for Discord.
+
+RED, YELLOW, GREEN, BLUE, WILD_COLOR = range(5)
+COLORS = (RED, YELLOW, GREEN, BLUE)
+COLOR_EMOJIS = ('🔴', '🟡', '🟢', '🔵', '')
+
+SKIP, REVERSE, DRAW_TWO, WILD, DRAW_FOUR = range(10, 15)
+VALUE_LABELS = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '⏭️', '🔁', '+2', 'Wild', '+4')
+
+CARD_SLOTS = (WILD_COLOR + 1) << 4
+
+
+def make_card(color, value):
+    return (color << 4) | value
+
+
+def _label(card):
+    color, value = card >> 4, card & 15
+    if value > DRAW_FOUR:
+        return "?"  # unused slot
+    if color == WILD_COLOR:
+        return VALUE_LABELS[value]
+    return f"{COLOR_EMOJIS[color]} {VALUE_LABELS[value]}"
+
+
+# ---- Lookup tables, indexed by card ----
+CARD_COLOR = [card >> 4 for card in range(CARD_SLOTS)]
+CARD_VALUE = [card & 15 for card in range(CARD_SLOTS)]
+CARD_LABELS = [_label(card) for card in range(CARD_SLOTS)]
+DRAW_AMOUNT = [{DRAW_TWO: 2, DRAW_FOUR: 4}.get(card & 15, 0) for card in range(CARD_SLOTS)]
+
+WILDS = (make_card(WILD_COLOR, WILD), make_card(WILD_COLOR, DRAW_FOUR))
+# Values that can't be the card turned over to start the game
+NOT_STARTING = frozenset((SKIP, DRAW_TWO, WILD, DRAW_FOUR))
+
+
+def _play_mask(top, stacking):
+    """Bitmask of every card that may go on top: bit N is set if card N is playable."""
+    mask = 0
+    for card in range(CARD_SLOTS):
+        if stacking:
+            ok = DRAW_AMOUNT[card] and CARD_VALUE[card] == CARD_VALUE[top]
+        else:
+            ok = (CARD_COLOR[card] == WILD_COLOR
+                  or CARD_COLOR[card] == CARD_COLOR[top]
+                  or CARD_VALUE[card] == CARD_VALUE[top])
+        if ok:
+            mask |= 1 << card
+    return mask
+
+
+# PLAY_MASKS[stacking][top], where stacking is 1 while a +2/+4 draw stack is pending
+PLAY_MASKS = [[_play_mask(top, stacking) for top in range(CARD_SLOTS)] for stacking in (False, True)]
+
+
+def is_playable(card, top, draw_stack):
+    return PLAY_MASKS[draw_stack > 0][top] >> card & 1
+
+
+def playable_cards(hand, top, draw_stack):
+    mask = PLAY_MASKS[draw_stack > 0][top]
+    return [card for card in hand if mask >> card & 1]
+
+
+def recolor(card, color):
+    """The card a played wild becomes once its color is chosen."""
+    return make_card(color, CARD_VALUE[card])
+
+
+def unplayed(card):
+    """The card as it goes back into the deck: a played wild loses its chosen color."""
+    return make_card(WILD_COLOR, CARD_VALUE[card]) if CARD_VALUE[card] >= WILD else card
+
+
+def card_label(card):
+    return CARD_LABELS[card]
+
+
+def new_deck(rng=random):
+    """A shuffled 112-card deck: two of every colored card and four of each wild."""
+    deck = [make_card(color, value) for color in COLORS for value in range(DRAW_TWO + 1)] * 2
+    deck += list(WILDS) * 4
+    rng.shuffle(deck)
+    return deck